@@ -0,0 +1,217 @@
+"""
+游戏热点路径的基准测试用例
+所有随机量都来自固定种子的随机数生成器，关卡逻辑不输入任何按键，保证每次测试的工作量完全相同。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import json
+import os
+
+import pygame
+
+from source import setup, tools, replay
+from source.states import level
+from source.components import enemy
+
+from .harness import measure, summarize
+
+GRAPHICS_DIR = 'resources/graphics'
+MAP_DIR = 'source/data/maps'
+NO_KEYS = replay.KEY_STATES[0]  # 不按任何键
+GAME_INFO = {'score': 0, 'coin': 0, 'lives': 3, 'player_state': 'small'}
+
+
+def new_level(level_num=1):
+    """
+    创建并开启一个关卡
+    :param level_num: 关卡序号
+    :return: 关卡对象和它的游戏时钟
+    """
+    clock = tools.GameClock()
+    lv = level.Level(clock)
+    lv.start(dict(GAME_INFO, level_num=level_num))
+    return lv, clock
+
+
+def step(lv, clock, keys=NO_KEYS):
+    """
+    推进关卡一个逻辑步
+    :param lv: 关卡对象
+    :param clock: 关卡的游戏时钟
+    :param keys: 按键状态
+    """
+    clock.tick()
+    lv.update(None, keys)
+
+
+def bench_load_graphics(rng, repeat):
+    """ 加载素材文件夹中所有图片的耗时，分别测试依次解码和线程池并行解码 """
+    files = [name for name in os.listdir(GRAPHICS_DIR) if name.lower().endswith('.png')]
+    serial = measure(lambda: tools.load_graphics(GRAPHICS_DIR, workers=1), repeat)
+    parallel = measure(lambda: tools.load_graphics(GRAPHICS_DIR), repeat)
+    return {'load_graphics': summarize(parallel, files=len(files), workers=os.cpu_count()),
+            'load_graphics.serial': summarize(serial, files=len(files))}
+
+
+def bench_get_image(rng, repeat, calls=200):
+    """ 从精灵图中截取并放大玩家帧图片的耗时(单次调用)，分别测试经过帧图片缓存和不经过缓存的情况 """
+    with open('source/data/player/mario.json') as f:
+        frame_groups = json.load(f)['image_frames']
+    rects = [(r['x'], r['y'], r['width'], r['height']) for group in frame_groups.values() for r in group]
+    sheet = setup.GRAPHICS['mario_bros']
+    picks = [rng.choice(rects) for _ in range(calls)]
+
+    def run(func):
+        for rect in picks:
+            func(sheet, *rect, 2.9)
+
+    tools.FRAME_CACHE.clear()
+    uncached = [s / calls for s in measure(lambda: run(tools.make_image), repeat)]
+    cached = [s / calls for s in measure(lambda: run(tools.get_image), repeat)]
+    return {'get_image': summarize(cached), 'get_image.uncached': summarize(uncached)}
+
+
+def bench_level_start(rng, repeat):
+    """ 每张地图的关卡初始化耗时 """
+    results = {}
+    for file_name in sorted(os.listdir(MAP_DIR)):
+        name, ext = os.path.splitext(file_name)
+        if ext != '.json':
+            continue
+        level_num = int(name.split('_')[-1])
+        samples = measure(lambda: new_level(level_num), repeat)
+        results['level_start.' + name] = summarize(samples)
+    return results
+
+
+def spawn_enemies(lv, rng, count):
+    """
+    在关卡前段的地面上随机放置敌人，位置离玩家足够远，测试期间不会碰到玩家
+    :param lv: 关卡对象
+    :param rng: 随机数生成器
+    :param count: 敌人数量
+    """
+    for _ in range(count):
+        lv.enemy_group.add(enemy.create_enemy({
+            'type': rng.choice([0, 1]), 'x': rng.randint(700, 2400), 'y': 538, 'direction': 0, 'color': 0}))
+
+
+def bench_level_update(rng, repeat, enemy_counts=(0, 10, 50, 200), frames=120):
+    """ 稳定状态下带有不同数量敌人的关卡单帧更新耗时 """
+    results = {}
+    for count in enemy_counts:
+        samples = []
+        for _ in range(repeat):
+            lv, clock = new_level()
+            spawn_enemies(lv, rng, count)
+            step(lv, clock)  # 预热
+            samples.extend(measure(lambda: step(lv, clock), 1, warmup=0, number=frames))
+        results['level_update.enemies_{}'.format(count)] = summarize(samples, frames=frames)
+    return results
+
+
+def bench_collisions(rng, repeat, queries=200):
+    """ 玩家在地图各处做一次x方向和y方向碰撞检测的耗时 """
+    lv, clock = new_level()
+    player = lv.player
+    positions = [rng.randint(0, lv.end_x - 100) for _ in range(queries)]
+
+    def run():
+        for x in positions:
+            player.rect.x = x
+            player.rect.bottom = 539  # 陷入地面一个像素
+            player.state, player.x_vel, player.y_vel = 'walk', 0, 0
+            lv.check_x_collisions()
+            lv.check_y_collisions()
+
+    samples = [s / queries for s in measure(run, repeat)]
+    return {'collisions.player_xy': summarize(samples)}
+
+
+def bench_enemy_wave(rng, repeat, enemy_counts=(50, 200, 800)):
+    """
+    大量敌人时动态精灵之间的碰撞检测耗时(单帧)：敌人组更新之后每个滑动的龟壳查询一次敌人组，
+    分别测试按x轴排序的查询和逐个检测的情况
+    """
+    results = {}
+    for count in enemy_counts:
+        lv, clock = new_level()
+        spawn_enemies(lv, rng, count)
+        shells = [enemy.create_enemy({'type': 1, 'x': rng.randint(0, lv.end_x), 'y': 538, 'direction': 0,
+                                      'color': 0}) for _ in range(count // 4)]
+
+        def swept():
+            lv.enemy_group.moved()  # 每帧敌人移动之后重新排序
+            for shell in shells:
+                lv.enemy_group.collide(shell)
+
+        def scan():
+            for shell in shells:
+                pygame.sprite.spritecollideany(shell, lv.enemy_group)
+
+        name = 'collisions.enemy_wave_{}'.format(count)
+        results[name] = summarize(measure(swept, repeat), shells=len(shells))
+        results[name + '.scan'] = summarize(measure(scan, repeat), shells=len(shells))
+    return results
+
+
+def bench_contact_batch(rng, repeat, enemy_counts=(0, 1, 2, 4, 16), frames=120):
+    """
+    不同数量的动态精灵在活动范围内时关卡单帧更新的耗时，分别测试做批量碰撞检测和直接查询索引的情况，
+    C.CONTACT_BATCH取两者耗时的交叉点
+    """
+    results = {}
+    for count in enemy_counts:
+        # 放在窗口右半边，测试期间既不休眠也碰不到玩家，两种情况用同样的敌人
+        enemies = [{'type': rng.choice([0, 1]), 'x': rng.randint(600, 1000), 'y': 538, 'direction': 0, 'color': 0}
+                   for _ in range(count)]
+        for name, batch_size in (('batch', 1), ('query', float('inf'))):
+            samples = []
+            for _ in range(repeat):
+                lv, clock = new_level()
+                lv.solids.batch_size = batch_size
+                for enemy_data in enemies:
+                    lv.enemy_group.add(enemy.create_enemy(enemy_data))
+                step(lv, clock)  # 预热
+                samples.extend(measure(lambda: step(lv, clock), 1, warmup=0, number=frames))
+            results['contact_batch.sprites_{}.{}'.format(count + 1, name)] = summarize(samples, frames=frames)
+    return results
+
+
+def bench_level_draw(rng, repeat, enemy_counts=(0, 800), draws=60):
+    """ 窗口位于地图各处时关卡单帧绘制的耗时，同时统计平均每帧画出和剔除的精灵数以及blit次数 """
+    results = {}
+    surface = pygame.Surface(setup.SCREEN.get_size()).convert()
+    for count in enemy_counts:
+        lv, clock = new_level()
+        spawn_enemies(lv, rng, count)
+        step(lv, clock)
+        windows = [rng.randint(0, lv.end_x - lv.game_window.width) for _ in range(draws)]
+        counts = [0, 0, 0]
+
+        def run():
+            counts[:] = [0, 0, 0]
+            for x in windows:
+                lv.game_window.x = lv.last_window_x = x
+                lv.draw(surface)
+                counts[0] += lv.drawn
+                counts[1] += lv.culled
+                counts[2] += lv.blits
+
+        samples = [s / draws for s in measure(run, repeat)]
+        name = 'level_draw.enemies_{}'.format(count) if count else 'level_draw'
+        results[name] = summarize(samples, drawn=counts[0] / draws, culled=counts[1] / draws,
+                                  blits=counts[2] / draws)
+    return results
+
+
+CASES = {
+    'load_graphics': bench_load_graphics,
+    'get_image': bench_get_image,
+    'level_start': bench_level_start,
+    'level_update': bench_level_update,
+    'collisions': bench_collisions,
+    'enemy_wave': bench_enemy_wave,
+    'contact_batch': bench_contact_batch,
+    'level_draw': bench_level_draw
+}
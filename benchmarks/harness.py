@@ -0,0 +1,115 @@
+"""
+基准测试的计时、结果保存与基线对比
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import json
+import platform
+import statistics
+from time import perf_counter
+
+import pygame
+
+
+def measure(func, repeat, warmup=1, number=1):
+    """
+    测量函数的耗时
+    :param func: 待测函数，无参数
+    :param repeat: 计时轮数
+    :param warmup: 正式计时前的预热轮数
+    :param number: 每轮调用的次数，结果为单次调用的平均耗时
+    :return: 每轮的单次耗时(毫秒)列表
+    """
+    for _ in range(warmup):
+        for _ in range(number):
+            func()
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((perf_counter() - start) * 1000 / number)
+    return samples
+
+
+def summarize(samples, **extra):
+    """
+    汇总耗时样本
+    :param samples: 耗时样本(毫秒)
+    :param extra: 额外需要记录的字段，比如吞吐量
+    :return: 统计结果字典
+    """
+    result = {
+        'unit': 'ms',
+        'repeat': len(samples),
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0
+    }
+    result.update(extra)
+    return result
+
+
+def environment(seed):
+    """
+    记录测试环境，对比不同机器上的结果时做参考
+    :param seed: 随机数种子
+    :return: 环境信息字典
+    """
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'seed': seed
+    }
+
+
+def save(path, results, env):
+    """
+    保存测试结果
+    :param path: 文件路径
+    :param results: 测试名 -> 统计结果
+    :param env: 测试环境
+    """
+    with open(path, 'w') as f:
+        json.dump({'environment': env, 'results': results}, f, indent=4, sort_keys=True)
+
+
+def load(path):
+    """
+    读取测试结果
+    :param path: 文件路径
+    :return: 测试名 -> 统计结果
+    """
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(results, baseline, tolerance):
+    """
+    和基线对比，以中位数为准
+    :param results: 本次的测试结果
+    :param baseline: 基线测试结果
+    :param tolerance: 允许的变慢比例，超过即视为性能退化
+    :return: 对比结果列表，每一项为(测试名, 基线中位数, 本次中位数, 比值, 是否退化)
+    """
+    rows = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['median'], results[name]['median']
+        ratio = new / old if old else float('inf')
+        rows.append((name, old, new, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def report(rows):
+    """
+    打印对比结果
+    :param rows: compare()的返回值
+    """
+    print('{:<40}{:>12}{:>12}{:>9}'.format('benchmark', 'baseline', 'current', 'ratio'))
+    for name, old, new, ratio, regressed in rows:
+        print('{:<40}{:>12.4f}{:>12.4f}{:>8.2f}x{}'.format(name, old, new, ratio, '  REGRESSED' if regressed else ''))
@@ -0,0 +1,64 @@
+"""
+基准测试入口，需要在仓库根目录下以模块方式运行：
+    python -m benchmarks.run                   # 运行全部测试，结果写入benchmarks/results/latest.json
+    python -m benchmarks.run --save-baseline   # 运行并把结果保存为基线
+    python -m benchmarks.run --only level_update collisions
+存在基线文件时会自动和基线对比，有测试变慢超过容忍度时返回非零退出码。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import argparse
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+def parse_args():
+    """ 解析命令行参数 """
+    parser = argparse.ArgumentParser(description='超级玛丽基准测试')
+    parser.add_argument('--repeat', type=int, default=10, help='每个测试的计时轮数')
+    parser.add_argument('--seed', type=int, default=2022, help='随机数种子')
+    parser.add_argument('--only', nargs='*', default=None, help='只运行指定的测试')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'), help='测试结果的保存路径')
+    parser.add_argument('--baseline', default=BASELINE, help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='允许的变慢比例，默认10%%')
+    return parser.parse_args()
+
+
+def main():
+    """ 运行基准测试 """
+    args = parse_args()
+    os.chdir(ROOT)  # 游戏中的素材路径都是相对仓库根目录的
+    from source import constants as C
+    os.environ[C.HEADLESS_ENV] = '1'
+    from . import cases, harness
+
+    names = args.only or list(cases.CASES)
+    results = {}
+    for name in names:
+        print('running {} ...'.format(name))
+        # 每个测试使用独立的随机数生成器，单独运行某个测试时结果也不变
+        results.update(cases.CASES[name](random.Random('{}-{}'.format(args.seed, name)), args.repeat))
+    env = harness.environment(args.seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    harness.save(args.output, results, env)
+    print('results saved to {}'.format(args.output))
+    if args.save_baseline:
+        harness.save(args.baseline, results, env)
+        print('baseline saved to {}'.format(args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    rows = harness.compare(results, harness.load(args.baseline), args.tolerance)
+    harness.report(rows)
+    return 1 if any(regressed for *_, regressed in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,22 +3,90 @@
 __author__ = 201220014@smail.nju.edu.cn
 """
 
-from source import tools
-from source.states import main_menu, load_screen, level
+import argparse
+import os
 
+import pygame
 
-def main():
+from source import tools, replay, profiling
+from source import constants as C
 
-    """ 主程序 """
+STARTUP_GRAPHICS = ('title_screen', 'mario_bros', 'item_objects', 'tile_set', 'enemies')  # 启动时就要用到的精灵图
+
+
+def create_game(profiler=None, load_times=None, **kwargs):
+    """
+    创建游戏的各个状态和游戏主控对象，调用之前需要设置好是否以无窗口模式运行
+    :param profiler: 帧耗时分析器
+    :param load_times: 传入字典时记录启动时每个图片文件的解码和转换耗时
+    :param kwargs: 传给游戏主控类的其余参数
+    :return: 游戏主控对象
+    """
+    # 导入游戏状态的时候会初始化显示设备(见source/setup.py)，所以要在设置好无窗口模式之后再导入
+    from source import setup
+    from source.states import main_menu, load_screen, level
+
+    # 启动时要用到的图片在线程池中并行解码，没有烘焙好的背景图时第一关的背景也要解码
+    names = STARTUP_GRAPHICS if setup.BAKED is not None else STARTUP_GRAPHICS + ('level_1',)
+    setup.GRAPHICS.prefetch(names, timings=load_times)
+
+    clock = tools.GameClock()  # 游戏时钟，由主控对象推进，各个游戏状态共用
     state_dict = {
-        'main_menu': main_menu.MainMenu(),
-        'load_screen': load_screen.LoadScreen(),
-        'level': level.Level(),
-        'game_over': load_screen.GameOver()
+        'main_menu': main_menu.MainMenu(clock),
+        'load_screen': load_screen.LoadScreen(clock),
+        'level': level.Level(clock, profiler, interpolate=kwargs.get('fixed_timestep', False)),
+        'game_over': load_screen.GameOver(clock)
     }  # 创建游戏的各个状态对象存放在一个字典中
-    game = tools.Game(state_dict, 'main_menu')  # 创建游戏主控对象
+    return tools.Game(state_dict, 'main_menu', clock, profiler=profiler, **kwargs)
+
+
+def main(headless=False, turbo=False, render=True, max_frames=None, record_path=None, replay_path=None,
+         profile_path=None, fixed_timestep=False):
+    """
+    主程序
+    :param headless: 是否以无窗口模式运行(SDL虚拟显示驱动)
+    :param turbo: 是否以不限帧率的加速模式运行
+    :param render: 是否绘制游戏画面
+    :param max_frames: 最多推进的逻辑步数，None表示一直运行
+    :param record_path: 按键录像的保存路径，None表示不录制
+    :param replay_path: 待回放的按键录像路径，回放总是以无窗口的加速模式进行
+    :param profile_path: 退出时导出各阶段耗时统计的json文件路径，None表示不导出
+    :param fixed_timestep: 是否以固定步长模式运行(逻辑与渲染解耦，插值绘制)
+    """
+    if replay_path:
+        headless = turbo = True
+    if headless:
+        os.environ[C.HEADLESS_ENV] = '1'
+    profiler = profiling.Profiler()  # 帧耗时分析器，游戏中按F3显示耗时面板
+    recorder = replay.Recorder() if record_path else None
+    replayer = replay.Replay.load(replay_path) if replay_path else None
+    load_times = {}  # 启动时每个图片文件的解码和转换耗时
+    # 创建游戏主控对象
+    game = create_game(profiler, load_times, fixed_timestep=fixed_timestep, turbo=turbo, render=render,
+                       max_frames=max_frames, recorder=recorder, replay=replayer)
     game.run()  # 运行游戏主控类
+    if recorder:
+        recorder.save(record_path)
+    if profile_path:
+        profiler.dump(profile_path, load_times=load_times)
+    pygame.quit()
+
+
+def parse_args():
+    """ 解析命令行参数 """
+    parser = argparse.ArgumentParser(description='超级玛丽')
+    parser.add_argument('--headless', action='store_true', help='无窗口模式，使用SDL虚拟显示驱动')
+    parser.add_argument('--turbo', action='store_true', help='加速模式，不限制帧率')
+    parser.add_argument('--fixed-timestep', action='store_true', help='固定步长模式，逻辑与渲染解耦，渲染时插值')
+    parser.add_argument('--no-render', dest='render', action='store_false', help='不绘制游戏画面，只推进游戏逻辑')
+    parser.add_argument('--frames', type=int, default=None, help='推进指定的逻辑步数后退出')
+    parser.add_argument('--record', metavar='FILE', default=None, help='录制按键并在退出时保存到指定文件')
+    parser.add_argument('--replay', metavar='FILE', default=None, help='以无窗口加速模式回放指定的按键录像')
+    parser.add_argument('--profile', metavar='FILE', default=None, help='退出时将各阶段耗时统计导出为json文件')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    main()  # 游戏入口
+    args = parse_args()
+    main(args.headless, args.turbo, args.render, args.frames, args.record, args.replay, args.profile,
+         args.fixed_timestep)  # 游戏入口
@@ -0,0 +1,153 @@
+"""
+批量回放入口：把一个目录下的所有按键录像分发到进程池中，以无窗口加速模式回放并汇总成一份报告
+    python replay_runner.py recordings/ --workers 8 --output report.json
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+from time import perf_counter
+
+from source import constants as C
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def init_worker():
+    """ 工作进程初始化：以无窗口模式运行，素材路径相对仓库根目录 """
+    os.environ[C.HEADLESS_ENV] = '1'
+    # SDL默认会把SIGTERM转换成退出事件，工作进程就无法被进程池正常结束了
+    os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'
+    os.chdir(ROOT)
+
+
+def final_state(game):
+    """
+    记录回放结束时的游戏状态
+    :param game: 游戏主控对象
+    :return: 状态信息字典
+    """
+    state = game.state
+    info = {
+        'state': next(name for name, s in game.state_dict.items() if s is state),
+        'game_info': dict(state.game_info)
+    }
+    if hasattr(state, 'player'):  # 在关卡中结束的回放额外记录玩家的信息
+        info['player'] = {'x': state.player.rect.x, 'y': state.player.rect.y, 'state': state.player.state,
+                          'dead': state.player.dead}
+    return info
+
+
+def frame_stats(times):
+    """
+    统计每帧的耗时
+    :param times: 每帧耗时(毫秒)
+    :return: 统计结果字典
+    """
+    from source import profiling
+    samples = sorted(times)
+    if not samples:
+        return {'mean': 0, 'p50': 0, 'p95': 0, 'p99': 0, 'max': 0}
+    return {
+        'mean': sum(samples) / len(samples),
+        'p50': profiling.percentile(samples, 50),
+        'p95': profiling.percentile(samples, 95),
+        'p99': profiling.percentile(samples, 99),
+        'max': samples[-1]
+    }
+
+
+def replay_session(args):
+    """
+    在工作进程中回放一个录像
+    :param args: (录像路径, 是否绘制画面)
+    :return: 回放结果字典
+    """
+    path, render = args
+    from main import create_game
+    from source import replay
+    result = {'session': os.path.basename(path)}
+    try:
+        game = create_game(turbo=True, render=render, replay=replay.Replay.load(path))
+        times = []
+        while not game.done:
+            start = perf_counter()
+            game.update()
+            game.draw()
+            times.append((perf_counter() - start) * 1000)
+        result.update(frames=game.frame_count, final=final_state(game), frame_ms=frame_stats(times),
+                      total_ms=sum(times))
+    except Exception as e:  # 单个录像出错不影响其他录像，错误记录在报告里
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    return result
+
+
+def aggregate(results, wall_time, workers):
+    """
+    汇总所有录像的回放结果
+    :param results: 每个录像的回放结果
+    :param wall_time: 总共花费的真实时间(秒)
+    :param workers: 工作进程数
+    :return: 报告字典
+    """
+    ok = [r for r in results if 'error' not in r]
+    frames = sum(r['frames'] for r in ok)
+    busy_ms = sum(r['total_ms'] for r in ok)
+    return {
+        'sessions': len(results),
+        'failed': len(results) - len(ok),
+        'workers': workers,
+        'frames': frames,
+        'wall_seconds': wall_time,
+        'frames_per_second': frames / wall_time if wall_time else 0,
+        'frame_ms': {
+            'mean': busy_ms / frames if frames else 0,
+            'worst_p99': max((r['frame_ms']['p99'] for r in ok), default=0),
+            'max': max((r['frame_ms']['max'] for r in ok), default=0)
+        },
+        'results': sorted(results, key=lambda r: r['session'])
+    }
+
+
+def parse_args():
+    """ 解析命令行参数 """
+    parser = argparse.ArgumentParser(description='批量回放按键录像')
+    parser.add_argument('directory', help='存放按键录像的目录')
+    parser.add_argument('--pattern', default='*.smk', help='录像文件名的匹配模式')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='工作进程数，默认为CPU核数')
+    parser.add_argument('--render', action='store_true', help='回放时同时绘制画面(计入每帧耗时)')
+    parser.add_argument('--output', default='replay_report.json', help='报告的保存路径')
+    return parser.parse_args()
+
+
+def main():
+    """ 批量回放 """
+    from source import replay
+    args = parse_args()
+    paths = glob.glob(os.path.join(args.directory, args.pattern))
+    if not paths:
+        print('no recordings matching {} in {}'.format(args.pattern, args.directory))
+        return 1
+    # 先分发帧数多的录像，各进程的负载更均衡(游程编码的文件大小与帧数无关，闲置的长录像也只有几个字节)
+    paths.sort(key=replay.frame_count, reverse=True)
+    workers = max(1, min(args.workers, len(paths)))
+    start = perf_counter()
+    # 使用spawn方式创建进程，每个工作进程都有自己干净的pygame/SDL状态
+    pool = multiprocessing.get_context('spawn').Pool(workers, initializer=init_worker)
+    results = list(pool.imap_unordered(replay_session, [(path, args.render) for path in paths]))
+    pool.close()
+    pool.join()
+    report = aggregate(results, perf_counter() - start, workers)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print('{} sessions ({} failed), {} frames in {:.2f}s -> {}'.format(
+        report['sessions'], report['failed'], report['frames'], report['wall_seconds'], args.output))
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+活动区域：只有窗口附近的敌人、龟壳和强化道具参与每一帧的更新
+离窗口左右两侧超过一定距离的精灵进入休眠，不做任何计算；重新回到活动范围之后醒来，休眠期间对它来说时间是静止的：
+醒来时精灵的计时器顺延休眠的时长，从休眠前的状态继续运行。
+窗口左侧的精灵同样只是休眠而不移除：窗口虽然只向右移动，但向右走的敌人、滑动的龟壳仍然可能回到活动范围。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+from . import constants as C
+
+TIMERS = ('timer', 'death_timer', 'shell_timer')  # 精灵中以游戏时间记录的计时器，0表示没有开始计时
+
+
+def shift_timers(sprite, elapsed):
+    """
+    顺延精灵的计时器
+    :param sprite: 精灵
+    :param elapsed: 顺延的时长(毫秒)
+    """
+    for name in TIMERS:
+        value = getattr(sprite, name, 0)
+        if value:
+            setattr(sprite, name, value + elapsed)
+
+
+class ActiveRegion:
+    """ 活动区域，窗口向左右两侧各扩展margin """
+
+    def __init__(self, margin=C.ACTIVE_MARGIN):
+        """
+        活动区域构造函数
+        :param margin: 窗口两侧的扩展距离(像素)
+        """
+        self.margin = margin
+        self.left = self.right = 0  # 活动范围
+        self.time = self.last_time = 0  # 本逻辑步和上一个逻辑步的游戏时间
+        self.updated = {}  # 精灵 -> 最近一次更新时的游戏时间
+
+    def follow(self, window, current_time):
+        """
+        每个逻辑步按窗口的位置更新活动范围，在更新各精灵组之前调用
+        :param window: 窗口矩形
+        :param current_time: 当前游戏时间
+        """
+        self.left = window.left - self.margin
+        self.right = window.right + self.margin
+        self.last_time, self.time = self.time, current_time
+
+    def awake(self, group):
+        """
+        组内处于活动范围内的精灵
+        :param group: 动态精灵组(collision.SweepGroup)
+        :return: 精灵列表，按加入组的先后顺序排列
+        """
+        return group.span(self.left, self.right)
+
+    def update(self, group, *args):
+        """
+        更新组内处于活动范围内的精灵，刚醒来的精灵先顺延计时器
+        :param group: 动态精灵组(collision.SweepGroup)
+        :param args: 传给精灵update()的参数
+        """
+        sprites = self.awake(group)
+        updated, last_time = self.updated, self.last_time
+        for sprite in sprites:
+            since = updated.get(sprite)
+            if since is not None and since != last_time:  # 上一个逻辑步没有更新，说明刚从休眠中醒来
+                shift_timers(sprite, last_time - since)
+            updated[sprite] = self.time
+        group.update_some(sprites, *args)
@@ -0,0 +1,102 @@
+"""
+资源管理器：缓存放缩好的背景分块等体积较大的派生图片
+每个资源有引用计数，正在使用的资源不会被释放；不再使用的资源继续留在缓存中，
+总大小超出预算时按最近最少使用(LRU)的顺序释放，重新开始或者来回切换关卡时就不用重新放缩背景了。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+from collections import OrderedDict
+
+from . import constants as C
+
+
+class Asset:
+    """ 资源管理器中的一个资源 """
+
+    def __init__(self, surface):
+        """
+        资源构造函数
+        :param surface: pygame图片对象
+        """
+        self.surface = surface
+        # 像素数据占用的字节数(子图片与原图共用像素，不能按行跨度计算)
+        self.size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+        self.refs = 0  # 引用计数
+
+
+class AssetManager:
+    """ 带引用计数和内存预算的资源管理器 """
+
+    def __init__(self, budget=C.ASSET_BUDGET):
+        """
+        资源管理器构造函数
+        :param budget: 缓存的资源最多占用的字节数，正在使用的资源超出预算时不会被释放
+        """
+        self.budget = budget
+        self.assets = OrderedDict()  # 资源键 -> 资源，按最近使用的顺序排列(最近使用的在最后)
+        self.bytes = 0  # 缓存的资源占用的字节数
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.evictions = 0  # 因超出预算而释放的资源数
+
+    def acquire(self, key, create):
+        """
+        获取资源并增加引用计数，用完之后需要调用release()
+        :param key: 资源键
+        :param create: 缓存中没有时创建资源(pygame图片对象)的函数
+        :return: pygame图片对象
+        """
+        asset = self.assets.get(key)
+        if asset is None:
+            self.misses += 1
+            asset = self.assets[key] = Asset(create())
+            self.bytes += asset.size
+        else:
+            self.hits += 1
+            self.assets.move_to_end(key)
+        asset.refs += 1
+        self.evict()
+        return asset.surface
+
+    def release(self, key):
+        """
+        减少资源的引用计数，引用计数为0的资源留在缓存中，超出预算时才会被释放
+        :param key: 资源键
+        """
+        asset = self.assets.get(key)
+        if asset is not None and asset.refs > 0:
+            asset.refs -= 1
+            self.evict()
+
+    def evict(self):
+        """ 超出预算时从最久没有使用的资源开始释放没有被引用的资源 """
+        if self.bytes <= self.budget:
+            return
+        for key in [key for key, asset in self.assets.items() if asset.refs == 0]:
+            self.bytes -= self.assets.pop(key).size
+            self.evictions += 1
+            if self.bytes <= self.budget:
+                break
+
+    def clear(self):
+        """ 释放所有没有被引用的资源 """
+        for key in [key for key, asset in self.assets.items() if asset.refs == 0]:
+            self.bytes -= self.assets.pop(key).size
+
+    def usage(self):
+        """
+        资源管理器的使用情况
+        :return: 占用字节数、预算、资源数、正在使用的资源数、命中/未命中/释放次数组成的字典
+        """
+        return {
+            'bytes': self.bytes,
+            'budget': self.budget,
+            'assets': len(self.assets),
+            'in_use': sum(1 for asset in self.assets.values() if asset.refs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+ASSETS = AssetManager()  # 进程内共享的资源管理器
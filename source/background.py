@@ -0,0 +1,121 @@
+"""
+分块背景：放缩后的背景图按固定宽度切成竖条(分块)，窗口靠近时才放缩对应的分块，窗口走远之后交还给资源管理器
+关卡开始时只放缩初始窗口附近的分块，第一帧不用再临时放缩。
+分块由资源管理器缓存，重新开始关卡或者从主菜单进入第一关时直接取回；不再使用的分块超出内存预算时按LRU的顺序释放，
+所以关卡开始时不用放缩整张背景图，占用的内存也不随地图长度增长。
+每个分块与整张背景图用pygame.transform.scale()放缩后的对应区域逐像素相同：
+pygame的放缩是各方向独立的最近邻采样，放缩后第x列取原图第 x * 原图宽 // 放缩后宽 列。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import pygame
+
+from . import constants as C
+from . import setup, assets
+
+
+class TiledBackground:
+    """ 分块背景 """
+
+    def __init__(self, name, multi=C.BG_MULTI, tile_width=C.BG_TILE):
+        """
+        分块背景构造函数
+        :param name: 背景图的图片名
+        :param multi: 放缩系数
+        :param tile_width: 分块宽度(放缩后的像素)
+        """
+        self.name = name
+        self.multi = multi
+        self.tile_width = tile_width
+        self.source_size = setup.GRAPHICS[name].get_size()
+        self.size = (int(self.source_size[0] * multi), int(self.source_size[1] * multi))
+        self.count = -(-self.size[0] // tile_width)  # 分块数
+        self.tiles = {}  # 分块序号 -> 持有的分块图片
+
+    def get_rect(self):
+        """ 放缩后的背景矩形 """
+        return pygame.Rect((0, 0), self.size)
+
+    def key(self, index):
+        """
+        分块在资源管理器中的资源键
+        :param index: 分块序号
+        """
+        return 'background_tile', self.name, self.multi, self.tile_width, index
+
+    def scale_tile(self, index):
+        """
+        放缩一个分块
+        :param index: 分块序号
+        :return: pygame图片对象
+        """
+        left = index * self.tile_width
+        right = min(left + self.tile_width, self.size[0])
+        height = self.size[1]
+        source_width, source_height = self.source_size
+        columns = [x * source_width // self.size[0] for x in range(left, right)]
+        first, last = columns[0], columns[-1] + 1
+        # 先只在竖直方向放缩用到的原图列，再按列映射逐列复制
+        strip = pygame.transform.scale(setup.GRAPHICS[self.name].subsurface((first, 0, last - first, source_height)),
+                                       (last - first, height))
+        tile = pygame.Surface((right - left, height), strip.get_flags(), strip)
+        tile.fill((0, 0, 0, 0))
+        # 目标全为0，取最大值即原样复制(包括alpha通道)，不做alpha混合
+        tile.blits([(strip, (x, 0), (column - first, 0, 1, height), pygame.BLEND_RGBA_MAX)
+                    for x, column in enumerate(columns)], False)
+        return tile
+
+    def tile(self, index):
+        """
+        获取分块，第一次获取时从资源管理器取得并持有
+        :param index: 分块序号
+        :return: pygame图片对象
+        """
+        tile = self.tiles.get(index)
+        if tile is None:
+            tile = self.tiles[index] = assets.ASSETS.acquire(self.key(index), lambda: self.scale_tile(index))
+        return tile
+
+    def release(self, index):
+        """
+        交还分块
+        :param index: 分块序号
+        """
+        if self.tiles.pop(index, None) is not None:
+            assets.ASSETS.release(self.key(index))
+
+    def close(self):
+        """ 交还所有持有的分块 """
+        for index in list(self.tiles):
+            self.release(index)
+
+    def indices(self, left, right):
+        """
+        与x范围[left, right)重叠的分块序号
+        :param left: 范围左端
+        :param right: 范围右端(不含)
+        """
+        return range(max(left // self.tile_width, 0), min((right - 1) // self.tile_width + 1, self.count))
+
+    def stream(self, window, ahead=C.BG_AHEAD, behind=C.BG_BEHIND):
+        """
+        按窗口位置准备分块：窗口及其右侧ahead以内的分块预先放缩，窗口左侧behind以内的分块继续持有，其余的交还。
+        游戏中窗口只会向右移动，交还的是窗口后方的分块；重新开始关卡时窗口回到开头，交还的是远处的分块
+        :param window: 窗口矩形
+        :param ahead: 窗口右侧预先放缩的距离(像素)
+        :param behind: 窗口左侧保留的距离(像素)
+        """
+        for index in self.indices(window.left, window.right + ahead):
+            self.tile(index)
+        keep = self.indices(window.left - behind, window.right + ahead)
+        for index in [index for index in self.tiles if index not in keep]:
+            self.release(index)
+
+    def draw(self, surface, view):
+        """
+        绘制窗口内的背景
+        :param surface: 绘图设备
+        :param view: 窗口矩形(地图坐标)
+        """
+        for index in self.indices(view.left, view.right):
+            surface.blit(self.tile(index), (index * self.tile_width - view.x, -view.y))
@@ -0,0 +1,195 @@
+"""
+烘焙缓存：把截取、放大、翻转好的帧图片预先写到磁盘上
+像素数据按BGRA格式依次写入一个二进制文件，与窗口的像素格式一致，启动时通过内存映射直接创建图片，不再重新计算。
+另有一个json索引文件记录每张图片在二进制文件中的位置，以及缓存对应的素材文件哈希和放缩系数，素材或系数变化后缓存自动失效。
+放缩后的背景图不烘焙：整张关卡背景的原始像素有几十MB，而游戏中背景按分块在窗口靠近时才放缩(见background.py)，
+每次只用到窗口附近的几块，烘焙进来只会让缓存文件大上几十倍。
+生成缓存(在仓库根目录下运行)：
+    python -m source.bake
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import hashlib
+import json
+import mmap
+import os
+
+import pygame
+
+from . import constants as C
+
+CACHE_DIR = '.cache'
+INDEX_FILE = 'frames.json'
+DATA_FILE = 'frames.bin'
+VERSION = 2
+SCALES = ('BG_MULTI', 'PLAYER_MULTI', 'BRICK_MULTI', 'ENEMY_MULTI', 'POWERUP_MULTI')  # 影响烘焙结果的放缩系数
+MAP_DIR = 'source/data/maps'
+GAME_INFO = {'score': 0, 'coin': 0, 'lives': 3, 'player_state': 'small'}
+
+
+def cache_key(graphics_path):
+    """
+    计算缓存键：素材文件内容、放缩系数和缓存格式版本的哈希值
+    :param graphics_path: 素材文件夹路径
+    :return: 十六进制哈希字符串
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([VERSION] + [getattr(C, name) for name in SCALES]).encode())
+    for file_name in sorted(os.listdir(graphics_path)):
+        digest.update(file_name.encode())
+        with open(os.path.join(graphics_path, file_name), 'rb') as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()
+
+
+def frame_name(key):
+    """
+    帧图片在索引文件中的名字
+    :param key: (原图名, x, y, 宽, 高, 放大倍数, 抠图底色, 是否水平翻转)
+    """
+    return json.dumps(list(key))
+
+
+class BakedFrames:
+    """ 通过内存映射读取的烘焙缓存 """
+
+    def __init__(self, index, data):
+        """
+        烘焙缓存构造函数
+        :param index: 名字 -> (偏移量, 宽, 高, 是否带alpha层, 抠图底色)
+        :param data: 像素数据，需要支持缓冲区协议
+        """
+        self.index = index
+        self.data = data
+        self.view = memoryview(data)
+
+    @classmethod
+    def load(cls, graphics_path, cache_dir=CACHE_DIR):
+        """
+        读取烘焙缓存
+        :param graphics_path: 素材文件夹路径
+        :param cache_dir: 缓存文件夹路径
+        :return: 烘焙缓存，缓存不存在或者已经过期时返回None
+        """
+        try:
+            with open(os.path.join(cache_dir, INDEX_FILE)) as f:
+                index = json.load(f)
+            if index['key'] != cache_key(graphics_path):
+                return None
+            with open(os.path.join(cache_dir, DATA_FILE), 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(data) != index['size']:
+            return None
+        return cls(index['images'], data)
+
+    def __len__(self):
+        return len(self.index)
+
+    def image(self, name):
+        """
+        创建缓存中的图片，不带alpha层的图片转换成窗口的像素格式并设置抠图底色。
+        带alpha层的图片直接使用只读的映射内存，不能在上面绘图
+        :param name: 索引文件中的名字
+        :return: pygame图片对象，缓存中没有时返回None
+        """
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        offset, width, height, alpha, colorkey = entry
+        buffer = self.view[offset:offset + width * height * 4]
+        image = pygame.image.frombuffer(buffer, (width, height), 'BGRA')  # 直接使用映射的内存，不复制像素
+        if alpha:
+            return image
+        image = image.convert()
+        if colorkey:
+            image.set_colorkey(colorkey)
+        return image
+
+    def frame(self, key):
+        """
+        读取帧图片
+        :param key: (原图名, x, y, 宽, 高, 放大倍数, 抠图底色, 是否水平翻转)
+        :return: pygame图片对象，缓存中没有时返回None
+        """
+        return self.image(frame_name(key))
+
+
+def collect():
+    """
+    创建游戏中用到的各种对象，把所有会用到的帧图片都生成一遍
+    :return: 名字 -> 图片
+    """
+    from . import setup, tools
+    from .states import main_menu, load_screen, level
+    from .components import brick, enemy, powerup
+
+    setup.BAKED = None  # 从原图重新生成，不读取旧的缓存
+    tools.FRAME_CACHE.attach(setup.GRAPHICS, None)
+    tools.FRAME_CACHE.clear()
+    clock = tools.GameClock()
+    main_menu.MainMenu(clock)
+    load_screen.LoadScreen(clock)
+    lv = level.Level(clock)
+    for file_name in sorted(os.listdir(MAP_DIR)):
+        name, ext = os.path.splitext(file_name)
+        if ext == '.json':
+            lv.start(dict(GAME_INFO, level_num=int(name.split('_')[-1])))
+    # 地图中不一定出现的对象
+    for color in (0, 1):
+        brick.Brick(0, 0, 0, None, None, color)
+        for enemy_type in (0, 1):
+            for direction in (0, 1):
+                enemy.create_enemy({'type': enemy_type, 'x': 0, 'y': 0, 'direction': direction, 'color': color})
+    for name in ('mushroom', 'fire_flower'):
+        powerup.create_powerup(0, 0, name)
+    powerup.Fireball(0, 0, 1)
+    brick.Debris(0, 0, 0, 0)
+
+    images = {}
+    for key, image in tools.FRAME_CACHE.frames.items():
+        name = setup.GRAPHICS.name_of(key[0])
+        if name is not None:
+            images[frame_name((name,) + key[1:])] = image
+    return images
+
+
+def bake(images, graphics_path, cache_dir=CACHE_DIR):
+    """
+    写入烘焙缓存，先写临时文件再替换，写到一半中断也不会留下损坏的缓存
+    :param images: 名字 -> 图片
+    :param graphics_path: 素材文件夹路径
+    :param cache_dir: 缓存文件夹路径
+    :return: 像素数据的字节数
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    index = {}
+    offset = 0
+    data_path = os.path.join(cache_dir, DATA_FILE)
+    with open(data_path + '.tmp', 'wb') as f:
+        for name, image in sorted(images.items()):
+            width, height = image.get_size()
+            colorkey = image.get_colorkey()
+            index[name] = (offset, width, height, bool(image.get_flags() & pygame.SRCALPHA),
+                           tuple(colorkey) if colorkey else None)
+            f.write(pygame.image.tobytes(image, 'BGRA'))
+            offset += width * height * 4
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump({'key': cache_key(graphics_path), 'size': offset, 'images': index}, f)
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+    return offset
+
+
+def main():
+    """ 生成烘焙缓存 """
+    from . import setup
+    images = collect()
+    size = bake(images, setup.GRAPHICS_DIR)
+    print('baked {} images ({:.1f} MB) -> {}'.format(len(images), size / 2 ** 20, CACHE_DIR))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+批量关卡：在同一个进程里同时运行多个互相独立的关卡实例
+所有实例共用setup.GRAPHICS中的精灵图和放缩好的背景图，每个实例有自己的游戏时钟，互不影响。
+批量运行通常不需要窗口，导入本模块之前先设置无窗口模式的环境变量(见constants.HEADLESS_ENV)。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+from . import tools, replay
+from .states import level
+
+GAME_INFO = {'score': 0, 'coin': 0, 'lives': 3, 'player_state': 'small'}  # 每局开始时的游戏信息
+
+
+class LevelBatch:
+    """ 批量关卡类 """
+
+    def __init__(self, count, level_num=1, auto_reset=True):
+        """
+        批量关卡类构造函数
+        :param count: 关卡实例的数量
+        :param level_num: 关卡序号
+        :param auto_reset: 关卡结束(玩家死亡)后是否自动重新开始
+        """
+        self.level_num = level_num
+        self.auto_reset = auto_reset
+        self.clocks = [tools.GameClock() for _ in range(count)]
+        self.levels = [level.Level(clock) for clock in self.clocks]
+        self.episodes = [0] * count  # 每个实例已经结束的局数
+        for index in range(count):
+            self.reset(index)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def reset(self, index):
+        """
+        重新开始某个关卡实例
+        :param index: 实例序号
+        """
+        self.clocks[index].reset()
+        self.levels[index].start(dict(GAME_INFO, level_num=self.level_num))
+
+    def step(self, index, action):
+        """
+        推进某个关卡实例一个逻辑步
+        :param index: 实例序号
+        :param action: 按键，可以是按键掩码(见replay.encode_keys)，也可以是按键状态对象
+        :return: 推进之后的观测信息
+        """
+        keys = replay.KEY_STATES[action] if isinstance(action, int) else action
+        lv = self.levels[index]
+        self.clocks[index].tick()
+        lv.update(None, keys)
+        observation = self.observe(index)
+        if lv.finished:
+            self.episodes[index] += 1
+            if self.auto_reset:
+                self.reset(index)
+        return observation
+
+    def step_all(self, actions):
+        """
+        所有关卡实例各推进一个逻辑步
+        :param actions: 每个实例的按键，长度与实例数量相同
+        :return: 每个实例推进之后的观测信息
+        """
+        if len(actions) != len(self.levels):
+            raise ValueError('需要{}个按键输入，实际为{}个'.format(len(self.levels), len(actions)))
+        return [self.step(index, action) for index, action in enumerate(actions)]
+
+    def observe(self, index):
+        """
+        获取某个关卡实例的观测信息
+        :param index: 实例序号
+        :return: 观测信息字典
+        """
+        lv = self.levels[index]
+        return {
+            'frame': self.clocks[index].frame,
+            'x': lv.player.rect.x,
+            'y': lv.player.rect.y,
+            'state': lv.player.state,
+            'dead': lv.player.dead,
+            'done': lv.finished,
+            'window_x': lv.game_window.x
+        }
+
+    def draw(self, index, surface):
+        """
+        绘制某个关卡实例的当前画面
+        :param index: 实例序号
+        :param surface: 绘图设备
+        """
+        self.levels[index].draw(surface)
@@ -0,0 +1,549 @@
+"""
+碰撞检测的宽相位(broadphase)：索引关卡中的障碍物
+障碍物分为地面物品(地面、管道、台阶)、砖块、宝箱三层。地面物品永远不动，放在按x坐标建立的区间树里；
+砖块和宝箱放在均匀网格空间哈希里。查询时只检查附近的障碍物，耗时只与附近障碍物的密度有关，与地图长度无关。
+查询结果与对各精灵组依次调用pygame.sprite.spritecollideany()完全一致：按给定的层顺序、组内加入的先后顺序返回第一个碰到的障碍物。
+会动的精灵(敌人、龟壳、强化道具和火球)之间的碰撞用扫描排除法(sweep and prune)：组内精灵按左端排序，
+每次组更新之后重新排序一次，查询时二分查找x范围重叠的精灵，查询结果同样与spritecollideany()一致。
+绘制时同样通过这两种索引只取出窗口内的精灵(视锥剔除)。
+安装了numpy、需要碰撞检测的动态精灵(玩家和活动范围内的敌人、龟壳、强化道具)不少于C.CONTACT_BATCH个时，
+每个逻辑步把它们的矩形打包成数组，用一次向量化运算与所有静止的障碍物求交，得到每个精灵可能碰到的障碍物，
+之后该精灵的碰撞检测只检查这几个障碍物；精灵更少时打包的开销超过省下的查询，直接查询索引(见benchmarks的contact_batch)。
+碎砖块本身是会动的障碍物而不做碰撞检测，不参与打包，和被顶起的砖块一样在每次查询时逐个检查。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+import pygame
+
+from . import constants as C
+
+try:
+    import numpy
+except ImportError:  # numpy是可选依赖，没有时每次碰撞检测都查询障碍物索引
+    numpy = None
+
+LAYERS = ('ground', 'brick', 'box')  # 关卡中默认的障碍物检测顺序
+STATIC_LAYER = 'ground'  # 永远不动的障碍物所在的层，用区间树索引
+EMPTY_ROW = (2 ** 31 - 1, 0, -2 ** 31, 0)  # 批量碰撞检测的矩形数组中的空行，左端最大、右端最小，与任何矩形都不相交
+
+
+class IntervalNode:
+    """ 区间树节点，保存所有跨过中心点的区间 """
+
+    def __init__(self, sprites):
+        """
+        区间树节点构造函数，递归地建立整棵子树
+        :param sprites: 子树包含的精灵，区间为[rect.left, rect.right)，宽度必须大于0
+        """
+        # 以左端居中的区间的左端为中心点，该区间必定留在本节点，子树严格变小
+        self.center = sorted(sprite.rect.left for sprite in sprites)[len(sprites) // 2]
+        here, left, right = [], [], []
+        for sprite in sprites:
+            if sprite.rect.right <= self.center:
+                left.append(sprite)
+            elif sprite.rect.left > self.center:
+                right.append(sprite)
+            else:
+                here.append(sprite)
+        self.by_left = sorted(here, key=lambda s: s.rect.left)  # 按左端升序
+        self.by_right = sorted(here, key=lambda s: -s.rect.right)  # 按右端降序
+        self.left = IntervalNode(left) if left else None
+        self.right = IntervalNode(right) if right else None
+
+
+class IntervalIndex:
+    """
+    只读的区间树，按x坐标索引不动的障碍物，y方向的范围在查询时过滤。
+    查询与某个x范围重叠的障碍物耗时为O(log n + k)，k为重叠的障碍物数。
+    """
+
+    def __init__(self, sprites):
+        """
+        区间树构造函数
+        :param sprites: 障碍物精灵
+        """
+        self.sprites = [sprite for sprite in sprites if sprite.rect.width > 0]
+        self.root = IntervalNode(self.sprites) if self.sprites else None
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def span(self, left, right):
+        """
+        x范围与[left, right)重叠的障碍物
+        :param left: 范围左端
+        :param right: 范围右端(不含)
+        :return: 障碍物列表
+        """
+        found = []
+        node = self.root
+        stack = [node] if node else []
+        while stack:
+            node = stack.pop()
+            if right <= node.center:  # 查询范围在中心点左侧：左端小于right的区间都重叠
+                for sprite in node.by_left:
+                    if sprite.rect.left >= right:
+                        break
+                    found.append(sprite)
+                if node.left:
+                    stack.append(node.left)
+            elif left > node.center:  # 查询范围在中心点右侧：右端大于left的区间都重叠
+                for sprite in node.by_right:
+                    if sprite.rect.right <= left:
+                        break
+                    found.append(sprite)
+                if node.right:
+                    stack.append(node.right)
+            else:  # 查询范围跨过中心点：节点上的区间全部重叠
+                found.extend(node.by_left)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        return found
+
+    def overlapping(self, rect):
+        """
+        与矩形相交的障碍物
+        :param rect: 矩形
+        :return: 障碍物列表
+        """
+        return [sprite for sprite in self.span(rect.left, rect.right) if rect.colliderect(sprite.rect)]
+
+    def surface_below(self, x, y):
+        """
+        x处、y以下(含y)最近的障碍物表面
+        :param x: 横坐标
+        :param y: 纵坐标
+        :return: 顶端最高的障碍物，没有则返回None
+        """
+        below = [sprite for sprite in self.span(x, x + 1) if sprite.rect.top >= y]
+        return min(below, key=lambda s: s.rect.top, default=None)
+
+
+class SolidIndex:
+    """
+    障碍物索引。地面物品放进区间树，第一次查询时建立；静止的砖块和宝箱按所在网格放进空间哈希；
+    会动的障碍物(被顶起的砖块和宝箱、带速度的碎砖块)单独存放，每次查询都逐个检查，停下来之后再放回网格。
+    """
+
+    def __init__(self, cell_size=C.COLLISION_CELL, batch_size=C.CONTACT_BATCH):
+        """
+        障碍物索引构造函数
+        :param cell_size: 网格边长(像素)
+        :param batch_size: 做批量碰撞检测所需的最少动态精灵数
+        """
+        self.cell_size = cell_size
+        self.batch_size = batch_size
+        self.cells = {}  # (列, 行) -> 该网格中的障碍物列表
+        self.entries = {}  # 障碍物 -> [层名, 加入顺序, 所在网格(会动的障碍物为None)]
+        self.moving = {}  # 会动的障碍物(按加入顺序排列)
+        self.static = {}  # 地面物品(按加入顺序排列)
+        self.tree = None  # 地面物品的区间树，地面物品变化后重新建立
+        self.counter = 0  # 加入顺序计数器
+        self.version = 0  # 静止的障碍物每次变化都加一
+        self.rows = {}  # 静止的障碍物 -> 在矩形数组中的行号
+        self.solids = []  # 行号 -> 静止的障碍物，空行为None
+        self.free = []  # 空行的行号
+        self.rects = None  # 静止的障碍物的矩形数组，第一次批量碰撞检测时建立
+        self.changed = set()  # 上次更新矩形数组之后加入、移除或者移动过的障碍物，下次批量碰撞检测前更新到数组中
+        self.contacts = {}  # 动态精灵 -> (版本号, 扩展后的矩形, 可能碰到的障碍物列表)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cells_of(self, rect):
+        """
+        矩形覆盖的网格
+        :param rect: 矩形
+        :return: 网格坐标列表
+        """
+        size = self.cell_size
+        left, top = rect.left // size, rect.top // size
+        right, bottom = max(rect.right - 1, rect.left) // size, max(rect.bottom - 1, rect.top) // size
+        return [(x, y) for x in range(left, right + 1) for y in range(top, bottom + 1)]
+
+    def add(self, sprite, layer):
+        """
+        加入障碍物
+        :param sprite: 障碍物精灵
+        :param layer: 层名
+        """
+        self.remove(sprite)
+        self.counter += 1
+        entry = self.entries[sprite] = [layer, self.counter, None]
+        if layer == STATIC_LAYER:
+            self.static[sprite] = entry
+            self.tree = None
+            self.version += 1
+            self.changed.add(sprite)
+        elif hasattr(sprite, 'x_vel'):  # 带速度的精灵(碎砖块)每帧都在动，不放进网格
+            self.moving[sprite] = entry
+        else:
+            self.link(sprite, entry)
+
+    def remove(self, sprite):
+        """
+        移除障碍物(砖块被顶碎、碎砖块消亡等)
+        :param sprite: 障碍物精灵
+        """
+        entry = self.entries.pop(sprite, None)
+        if entry is None:
+            return
+        if entry[2] is not None:
+            self.unlink(sprite, entry)
+        self.moving.pop(sprite, None)
+        if self.static.pop(sprite, None) is not None:
+            self.tree = None
+            self.version += 1
+            self.changed.add(sprite)
+
+    def link(self, sprite, entry):
+        """ 按当前位置把障碍物放进网格 """
+        entry[2] = self.cells_of(sprite.rect)
+        for cell in entry[2]:
+            self.cells.setdefault(cell, []).append(sprite)
+        self.version += 1
+        self.changed.add(sprite)
+
+    def unlink(self, sprite, entry):
+        """ 把障碍物从网格中取出 """
+        for cell in entry[2]:
+            sprites = self.cells[cell]
+            sprites.remove(sprite)
+            if not sprites:
+                del self.cells[cell]
+        entry[2] = None
+        self.version += 1
+        self.changed.add(sprite)
+
+    def track(self, sprite):
+        """
+        障碍物开始移动(被顶起)，移动期间从网格中取出，每次查询都单独检查
+        :param sprite: 障碍物精灵
+        """
+        entry = self.entries.get(sprite)
+        if entry is not None and entry[2] is not None:
+            self.unlink(sprite, entry)
+            self.moving[sprite] = entry
+
+    def settle(self):
+        """ 把已经停下来的障碍物放回网格，每个逻辑步在障碍物更新之后调用 """
+        for sprite in list(self.moving):
+            if not hasattr(sprite, 'x_vel') and getattr(sprite, 'state', None) != 'bumped':
+                self.link(sprite, self.moving.pop(sprite))
+
+    def ground_tree(self):
+        """ 地面物品的区间树 """
+        if self.tree is None:
+            self.tree = IntervalIndex(self.static)
+        return self.tree
+
+    def surface_below(self, x, y):
+        """
+        x处、y以下(含y)最近的地面物品表面
+        :param x: 横坐标
+        :param y: 纵坐标
+        :return: 顶端最高的地面物品，没有则返回None
+        """
+        return self.ground_tree().surface_below(x, y)
+
+    def candidates(self, rect, layers=LAYERS):
+        """
+        可能与矩形相交的障碍物
+        :param rect: 矩形
+        :param layers: 参与检测的层
+        :return: 障碍物集合
+        """
+        found = set()
+        if STATIC_LAYER in layers:
+            found.update(self.ground_tree().overlapping(rect))
+        if len(layers) > 1 or STATIC_LAYER not in layers:
+            found.update(self.moving)
+            cells = self.cells
+            for cell in self.cells_of(rect):
+                sprites = cells.get(cell)
+                if sprites:
+                    found.update(sprites)
+        return found
+
+    def visible(self, rect, layer):
+        """
+        某一层中与矩形相交的障碍物
+        :param rect: 矩形(比如窗口)
+        :param layer: 层名
+        :return: 障碍物列表，按加入顺序排列
+        """
+        entries = self.entries
+        if layer == STATIC_LAYER:
+            found = self.ground_tree().overlapping(rect)
+        else:
+            found = set(self.moving)
+            for cell in self.cells_of(rect):
+                found.update(self.cells.get(cell, ()))
+            found = [sprite for sprite in found if entries[sprite][0] == layer and rect.colliderect(sprite.rect)]
+        found.sort(key=lambda sprite: entries[sprite][1])
+        return found
+
+    def solid_table(self):
+        """
+        静止的障碍物(地面物品和网格中的砖块、宝箱)及其矩形数组。数组在第一次用到时整体建立，
+        之后只更新变化过的障碍物所在的行：移除的障碍物留下空行(见EMPTY_ROW)，
+        新加入的障碍物优先填进空行，行数不够时数组容量翻倍
+        :return: (行号 -> 障碍物的列表, 形状为(行数, 4)的数组，每行为left, top, right, bottom)
+        """
+        if self.rects is None:
+            self.solids = [sprite for sprite, entry in self.entries.items()
+                           if entry[2] is not None or sprite in self.static]
+            self.rows = {sprite: row for row, sprite in enumerate(self.solids)}
+            self.rects = numpy.array([(s.rect.left, s.rect.top, s.rect.right, s.rect.bottom) for s in self.solids],
+                                     dtype=numpy.int32).reshape(-1, 4)
+            self.free = []
+            self.changed = set()
+        elif self.changed:
+            entries, static, rows, solids, free = self.entries, self.static, self.rows, self.solids, self.free
+            for sprite in self.changed:
+                entry = entries.get(sprite)
+                if entry is not None and (entry[2] is not None or sprite in static):
+                    row = rows.get(sprite)
+                    if row is None:
+                        if not free:
+                            self.grow()
+                        row = rows[sprite] = free.pop()
+                        solids[row] = sprite
+                    rect = sprite.rect
+                    self.rects[row] = (rect.left, rect.top, rect.right, rect.bottom)
+                elif sprite in rows:
+                    row = rows.pop(sprite)
+                    solids[row] = None
+                    self.rects[row] = EMPTY_ROW
+                    free.append(row)
+            self.changed = set()
+        return self.solids, self.rects
+
+    def grow(self):
+        """ 矩形数组的容量翻倍，新增的行都是空行 """
+        size = len(self.solids)
+        extra = max(size, 64)
+        self.rects = numpy.concatenate([self.rects, numpy.tile(numpy.array(EMPTY_ROW, dtype=numpy.int32),
+                                                               (extra, 1))])
+        self.solids.extend([None] * extra)
+        self.free.extend(range(size + extra - 1, size - 1, -1))  # 从小到大取用空行
+
+    def prepare(self, sprites, margin=C.CONTACT_MARGIN):
+        """
+        批量碰撞检测，每个逻辑步调用一次：把动态精灵的矩形向四周扩展margin后，与所有静止的障碍物一次性求交。
+        之后的逻辑步内，精灵只要还在扩展后的矩形里、静止的障碍物没有变化，碰撞检测就只检查求交得到的障碍物。
+        动态精灵少于batch_size个时不做批量检测，碰撞检测直接查询索引
+        :param sprites: 动态精灵
+        :param margin: 扩展距离(像素)
+        """
+        self.contacts = {}
+        sprites = list(sprites)
+        if numpy is None or not sprites or len(sprites) < self.batch_size:
+            return
+        solids, table = self.solid_table()
+        boxes = [sprite.rect.inflate(margin * 2, margin * 2) for sprite in sprites]
+        packed = numpy.array([(box.left, box.top, box.right, box.bottom) for box in boxes], dtype=numpy.int32)
+        left, top, right, bottom = (packed[:, i, None] for i in range(4))
+        hits = ((left < table[:, 2]) & (table[:, 0] < right) & (top < table[:, 3]) & (table[:, 1] < bottom))
+        rows, columns = numpy.nonzero(hits)  # 按行排列，同一个精灵的结果连在一起
+        bounds = numpy.searchsorted(rows, numpy.arange(len(sprites) + 1)).tolist()
+        columns = columns.tolist()
+        for i, sprite in enumerate(sprites):
+            self.contacts[sprite] = (self.version, boxes[i],
+                                     [solids[j] for j in columns[bounds[i]:bounds[i + 1]]])
+
+    def collide(self, sprite, layers=LAYERS):
+        """
+        查找与精灵相撞的障碍物
+        :param sprite: 精灵
+        :param layers: 参与检测的层及其先后顺序
+        :return: 先检测到的障碍物，没有则返回None
+        """
+        rect = sprite.rect
+        contact = self.contacts.get(sprite)
+        if contact is not None and contact[0] == self.version and contact[1].contains(rect):
+            others = contact[2] + list(self.moving)
+        else:
+            others = self.candidates(rect, layers)
+        best, best_key = None, None
+        for other in others:
+            layer, order, _ = self.entries[other]
+            if layer in layers and rect.colliderect(other.rect):
+                key = (layers.index(layer), order)
+                if best_key is None or key < best_key:
+                    best, best_key = other, key
+        return best
+
+
+class SolidGroup(pygame.sprite.Group):
+    """ 障碍物精灵组，组内精灵的加入和移除会同步到障碍物索引 """
+
+    def __init__(self, index, layer, *sprites):
+        """
+        障碍物精灵组构造函数
+        :param index: 障碍物索引
+        :param layer: 本组在索引中的层名
+        :param sprites: 初始精灵
+        """
+        self.index = index
+        self.layer = layer
+        pygame.sprite.Group.__init__(self, *sprites)
+
+    def add_internal(self, sprite, layer=None):
+        pygame.sprite.Group.add_internal(self, sprite, layer)
+        self.index.add(sprite, self.layer)
+
+    def remove_internal(self, sprite):
+        pygame.sprite.Group.remove_internal(self, sprite)
+        self.index.remove(sprite)
+
+    def visible(self, rect):
+        """
+        组内与矩形相交的精灵
+        :param rect: 矩形(比如窗口)
+        :return: 精灵列表，按加入组的先后顺序排列
+        """
+        return self.index.visible(rect, self.layer)
+
+
+left_edge = attrgetter('rect.left')  # 精灵的左端，排序用
+width = attrgetter('rect.width')
+
+
+class SweepGroup(pygame.sprite.Group):
+    """
+    按x轴排序的动态精灵组(sweep and prune)。组内精灵只在update()中移动，每次update()之后第一次查询时重新排序；
+    精灵每帧只移动几个像素，顺序变化很小，在上一次的顺序上重新排序接近线性时间。
+    update()进行中(组内精灵正在移动)的查询退回到逐个检测。
+    """
+
+    def __init__(self, *sprites):
+        """
+        动态精灵组构造函数
+        :param sprites: 初始精灵
+        """
+        self.order = {}  # 精灵 -> 加入顺序，与spritecollideany()的检测顺序一致
+        self.counter = 0  # 加入顺序计数器
+        self.axis = []  # 按左端排序的精灵
+        self.lefts = []  # 排序后各精灵的左端
+        self.max_width = 0  # 最宽的精灵宽度，用来确定查询范围的左边界
+        self.stale = True  # 精灵的位置或组成变化后需要重新排序
+        self.updating = False
+        pygame.sprite.Group.__init__(self, *sprites)
+
+    def add_internal(self, sprite, layer=None):
+        pygame.sprite.Group.add_internal(self, sprite, layer)
+        self.counter += 1
+        self.order[sprite] = self.counter
+        self.stale = True
+
+    def remove_internal(self, sprite):
+        pygame.sprite.Group.remove_internal(self, sprite)
+        del self.order[sprite]  # 排序结果中的精灵在查询时按是否还在组内过滤，不用重新排序
+
+    def update(self, *args, **kwargs):
+        self.update_some(self.sprites(), *args, **kwargs)
+
+    def update_some(self, sprites, *args, **kwargs):
+        """
+        只更新组内的部分精灵(比如活动范围内的精灵)
+        :param sprites: 待更新的精灵
+        """
+        self.updating = True
+        for sprite in sprites:
+            sprite.update(*args, **kwargs)
+        self.updating = False
+        self.stale = True
+
+    def moved(self):
+        """ 组内精灵在update()之外被移动(比如被踢的龟壳)后调用 """
+        self.stale = True
+
+    def sweep(self):
+        """ 在上一次的顺序上重新排序，新加入的精灵排在后面参与排序 """
+        order = self.order
+        axis = [sprite for sprite in self.axis if sprite in order]
+        if len(axis) < len(order):
+            known = set(axis)
+            axis.extend(sprite for sprite in order if sprite not in known)
+        axis.sort(key=left_edge)
+        self.axis = axis
+        self.lefts = list(map(left_edge, axis))
+        self.max_width = max(map(width, axis), default=0)
+        self.stale = False
+
+    def nearby(self, rect):
+        """
+        x范围与矩形重叠的精灵，可能包含已经离开组的精灵
+        :param rect: 矩形
+        :return: 精灵列表，按左端排列
+        """
+        if self.stale:
+            self.sweep()
+        # 重叠的精灵满足 left < rect.right 且 left + width > rect.left
+        start = bisect_left(self.lefts, rect.left - self.max_width + 1)
+        end = bisect_left(self.lefts, rect.right, start)
+        return self.axis[start:end]
+
+    def visible(self, rect):
+        """
+        组内与矩形相交的精灵
+        :param rect: 矩形(比如窗口)
+        :return: 精灵列表，按加入组的先后顺序排列
+        """
+        order = self.order
+        found = [sprite for sprite in self.nearby(rect) if sprite in order and rect.colliderect(sprite.rect)]
+        found.sort(key=order.__getitem__)
+        return found
+
+    def span(self, left, right):
+        """
+        x范围与[left, right]相交(包括边界)的精灵
+        :param left: 左边界
+        :param right: 右边界
+        :return: 精灵列表，按加入组的先后顺序排列
+        """
+        if self.stale:
+            self.sweep()
+        order = self.order
+        # 相交的精灵满足 left - width <= sprite.left <= right，先按最宽的精灵缩小范围再逐个检查右端
+        start = bisect_left(self.lefts, left - self.max_width)
+        end = bisect_right(self.lefts, right, start)
+        found = [sprite for sprite in self.axis[start:end] if sprite in order and sprite.rect.right >= left]
+        found.sort(key=order.__getitem__)
+        return found
+
+    def collide(self, sprite):
+        """
+        查找组内与精灵相撞的精灵，结果与pygame.sprite.spritecollideany(sprite, self)一致
+        :param sprite: 精灵
+        :return: 最先加入组的相撞精灵，没有则返回None
+        """
+        if self.updating:
+            return pygame.sprite.spritecollideany(sprite, self)
+        rect = sprite.rect
+        order = self.order
+        best, best_order = None, None
+        for other in self.nearby(rect):
+            other_order = order.get(other)
+            if other_order is not None and (best is None or other_order < best_order) \
+                    and rect.colliderect(other.rect):
+                best, best_order = other, other_order
+        return best
+
+
+def visible(group, rect):
+    """
+    精灵组中与矩形相交的精灵，带索引的组(SolidGroup、SweepGroup)通过索引查询，其他组逐个检测
+    :param group: 精灵组
+    :param rect: 矩形(比如窗口)
+    :return: 精灵列表，按加入组的先后顺序排列
+    """
+    if isinstance(group, (SolidGroup, SweepGroup)):
+        return group.visible(rect)
+    return [sprite for sprite in group if rect.colliderect(sprite.rect)]
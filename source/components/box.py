@@ -50,7 +50,7 @@ class Box(pygame.sprite.Sprite):
 
     def update(self):
         """ 更新函数 """
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = self.level.current_time
         self.handle_states()
 
     def handle_states(self):
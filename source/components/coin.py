@@ -35,10 +35,13 @@ class FlashingCoin(pygame.sprite.Sprite):
         for frame_rect in frame_rects:
             self.frames.append(tools.get_image(sheet, *frame_rect, C.BG_MULTI))  # * means decouple
 
-    def update(self):
-        """ 更新函数 """
+    def update(self, current_time):
+        """
+        更新函数
+        :param current_time: 当前游戏时间
+        """
         # 下面主要是一些动画逻辑
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = current_time
         frame_durations = [375, 125, 125, 125]
         if self.timer == 0:
             self.timer = self.current_time
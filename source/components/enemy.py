@@ -10,16 +10,38 @@ from .. import setup, tools
 from .. import constants as C
 
 
+# 帧图片库：(敌人名称, 颜色, 方向) -> 帧序列，同种同色敌人的所有实例共用同一组帧图片
+frame_banks = {}
+
+
+def load_frames(name, color, direction, frame_rects):
+    """
+    从帧图片库中取出帧序列，库中没有时截取帧图片并放入库中
+    :param name: 敌人名称
+    :param color: 颜色
+    :param direction: 方向，0为朝左(精灵图中的原始朝向)，1为朝右
+    :param frame_rects: 帧图片矩形范围序列
+    :return: 帧序列
+    """
+    key = (name, color, direction)
+    frames = frame_banks.get(key)
+    if frames is None:
+        frames = frame_banks[key] = tuple(tools.get_image(setup.GRAPHICS['enemies'], *frame_rect, C.ENEMY_MULTI,
+                                                          flip=direction == 1) for frame_rect in frame_rects)
+    return frames
+
+
 def create_enemy(enemy_data):
     """
     根据敌人数据创建敌人对象
     :param enemy_data: 敌人数据
-    :return: 敌人对象
+    :return: 敌人对象，尚未实现的敌人种类返回None
     """
     # 获取数据
     enemy_type = enemy_data['type']
     x, y_bottom, direction, color = enemy_data['x'], enemy_data['y'], enemy_data['direction'], enemy_data['color']
     # 创建敌人
+    enemy = None
     if enemy_type == 0:  # Goomba 蘑菇怪
         enemy = Goomba(x, y_bottom, direction, 'goomba', color)
     elif enemy_type == 1:  # Koopa 乌龟
@@ -31,13 +53,14 @@ def create_enemy(enemy_data):
 class Enemy(pygame.sprite.Sprite):
     """ 敌人类 """
 
-    def __init__(self, x, y_bottom, direction, name, frame_rects):
+    def __init__(self, x, y_bottom, direction, name, color, frame_rects):
         """
         敌人类的构造函数
         :param x: x坐标
         :param y_bottom: 底部y坐标
         :param direction: 方向
         :param name: 名称
+        :param color: 颜色
         :param frame_rects: 帧矩形范围序列
         """
         pygame.sprite.Sprite.__init__(self)
@@ -45,8 +68,6 @@ class Enemy(pygame.sprite.Sprite):
         self.direction = direction
         self.name = name
         self.frame_index = 0
-        self.left_frames = []
-        self.right_frames = []
         self.timer = 0
         # 初始化运动属性
         self.x_vel = -1 * C.ENEMY_SPEED if self.direction == 0 else C.ENEMY_SPEED
@@ -54,30 +75,20 @@ class Enemy(pygame.sprite.Sprite):
         self.gravity = C.GRAVITY
         self.state = 'walk'
         # 载入帧图片
-        self.load_frames(frame_rects)
+        self.left_frames = load_frames(name, color, 0, frame_rects)
+        self.right_frames = load_frames(name, color, 1, frame_rects)
         self.frames = self.left_frames if self.direction == 0 else self.right_frames
         self.image = self.frames[self.frame_index]
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.bottom = y_bottom
 
-    def load_frames(self, frame_rects):
-        """
-        载入帧图片
-        :param frame_rects: 帧图片矩形范围序列
-        """
-        for frame_rect in frame_rects:
-            left_frame = tools.get_image(setup.GRAPHICS['enemies'], *frame_rect, C.ENEMY_MULTI)
-            right_frame = pygame.transform.flip(left_frame, True, False)
-            self.left_frames.append(left_frame)
-            self.right_frames.append(right_frame)
-
     def update(self, level):
         """
         更新函数
         :param level: 关卡对象
         """
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = level.current_time
         self.handle_states(level)
         self.update_position(level)
 
@@ -150,7 +161,7 @@ class Enemy(pygame.sprite.Sprite):
         :param level: 关卡对象
         """
         # 碰壁反向的逻辑
-        sprite = pygame.sprite.spritecollideany(self, level.ground_items_group)
+        sprite = level.solids.collide(self, ('ground',))
         if sprite:
             if self.direction:  # 向右
                 self.direction = 0
@@ -161,7 +172,7 @@ class Enemy(pygame.sprite.Sprite):
             self.x_vel *= -1
         # 滑动的龟壳可以杀死怪物
         if self.state == 'slide':
-            enemy = pygame.sprite.spritecollideany(self, level.enemy_group)
+            enemy = level.enemy_group.collide(self)
             if enemy:
                 enemy.go_die('slided', self.direction)
                 level.enemy_group.remove(enemy)
@@ -172,8 +183,7 @@ class Enemy(pygame.sprite.Sprite):
         y方向的碰撞检测
         :param level: 关卡对象
         """
-        check_group = pygame.sprite.Group(level.ground_items_group, level.box_group, level.brick_group)
-        sprite = pygame.sprite.spritecollideany(self, check_group)
+        sprite = level.solids.collide(self, ('ground', 'box', 'brick'))
         if sprite:
             if self.rect.bottom > sprite.rect.top:
                 self.rect.bottom = sprite.rect.top
@@ -220,7 +230,7 @@ class Goomba(Enemy):
         else:
             frame_rects = dark_frame_rects
         # 调用父类构造函数
-        Enemy.__init__(self, x, y_bottom, direction, name, frame_rects)
+        Enemy.__init__(self, x, y_bottom, direction, name, color, frame_rects)
 
     def trampled(self, level):
         """
@@ -255,7 +265,7 @@ class Koopa(Enemy):
             frame_rects = bright_frame_rects
         else:
             frame_rects = dark_frame_rects
-        Enemy.__init__(self, x, y_bottom, direction, name, frame_rects)
+        Enemy.__init__(self, x, y_bottom, direction, name, color, frame_rects)
         # 龟壳计时器
         self.shell_timer = 0
 
@@ -3,6 +3,8 @@
 __author__ = 201220014@smail.nju.edu.cn
 """
 
+from collections import OrderedDict
+
 import pygame
 
 from .. import constants as C
@@ -11,6 +13,155 @@ from .. import setup, tools
 
 pygame.font.init()  # 初始化pygame字体模块
 
+GLYPHS = ''.join(chr(i) for i in range(32, 127))  # 字形图集包含的字符(可打印的ASCII字符)
+WHITE = (255, 255, 255)  # 文字颜色
+
+
+def opaque_bytes(image):
+    """
+    把图片画到黑色底板上取出像素，用来比较两张图片画出来是否一样
+    :param image: 图片
+    :return: 像素数据
+    """
+    board = pygame.Surface(image.get_size())
+    board.blit(image, (0, 0))
+    return pygame.image.tobytes(board, 'RGB')
+
+
+class GlyphAtlas:
+    """
+    字形图集：每个字符只渲染一次，文字标签按字体排版的位置(含字距调整)拼接字形后整体放缩一次，
+    与整串文字直接渲染再放缩的结果逐像素相同。
+    少数字符对挨在一起时字形会随亚像素位置变化(比如'ij')，每个字符对第一次出现时核对一次，
+    含有这种字符对或图集外字符的标签整串渲染。
+    拼好的标签放在容量有限的LRU缓存里，同样的文字再次创建时直接返回同一张图片。
+    """
+
+    def __init__(self, size=40, width_scale=1.25, height_scale=1):
+        """
+        字形图集构造函数
+        :param size: 字体大小
+        :param width_scale: 标签宽系数
+        :param height_scale: 标签高系数
+        """
+        self.font = pygame.font.SysFont(C.FONT, size)
+        self.width_scale = width_scale
+        self.height_scale = height_scale
+        self.glyphs = {char: self.font.render(char, False, WHITE) for char in GLYPHS}
+        self.pairs = {}  # 字符对 -> 拼接结果是否与整串渲染相同
+        self.labels = OrderedDict()  # 文字 -> 拼好的标签图片，按最近使用排序
+
+    def compose(self, text):
+        """
+        按字体排版的位置拼接字形(不放缩)，字形的右边缘对齐到前缀文字的宽度，因此带上了字距调整
+        :param text: 文字内容，只能包含图集中的字符
+        :return: 拼好的图片
+        """
+        image = pygame.Surface(self.font.size(text), pygame.SRCALPHA)
+        for i, char in enumerate(text):
+            glyph = self.glyphs[char]
+            image.blit(glyph, (self.font.size(text[:i + 1])[0] - glyph.get_width(), 0))
+        return image
+
+    def composable(self, text):
+        """
+        判断文字能否由字形拼接，每个字符对只核对一次
+        :param text: 文字内容
+        :return: 能否拼接
+        """
+        if not text or any(char not in self.glyphs for char in text):
+            return False
+        for i in range(len(text) - 1):
+            pair = text[i:i + 2]
+            safe = self.pairs.get(pair)
+            if safe is None:
+                safe = self.pairs[pair] = opaque_bytes(self.compose(pair)) == opaque_bytes(
+                    self.font.render(pair, False, WHITE))
+            if not safe:
+                return False
+        return True
+
+    def draw_label(self, text):
+        """
+        生成文字标签(不经过缓存)
+        :param text: 文字内容
+        :return: 标签图片
+        """
+        if self.composable(text):
+            image = self.compose(text)
+        else:
+            image = self.font.render(text, False, WHITE)
+        rect = image.get_rect()
+        return pygame.transform.scale(image, (int(rect.width * self.width_scale),
+                                              int(rect.height * self.height_scale)))
+
+    def render(self, text):
+        """
+        获取文字标签，优先从缓存中取
+        :param text: 文字内容
+        :return: 标签图片，与其他调用者共用，不能在上面绘图
+        """
+        image = self.labels.get(text)
+        if image is None:
+            image = self.labels[text] = self.draw_label(text)
+            if len(self.labels) > C.LABEL_CACHE:
+                self.labels.popitem(last=False)
+        else:
+            self.labels.move_to_end(text)
+        return image
+
+
+atlases = {}  # (字体大小, 宽系数, 高系数) -> 字形图集，第一次用到的时候才创建
+
+
+def get_atlas(size=40, width_scale=1.25, height_scale=1):
+    """
+    获取字形图集
+    :param size: 字体大小
+    :param width_scale: 字形宽系数
+    :param height_scale: 字形高系数
+    :return: 字形图集
+    """
+    key = (size, width_scale, height_scale)
+    atlas = atlases.get(key)
+    if atlas is None:
+        atlas = atlases[key] = GlyphAtlas(size, width_scale, height_scale)
+    return atlas
+
+
+class HudField:
+    """ 随游戏信息变化的文字标签，只在数值变化时重新拼接，只保留当前数值的图片、不进缓存 """
+
+    def __init__(self, key, template, pos):
+        """
+        文字标签构造函数
+        :param key: 对应的游戏信息键
+        :param template: 文字模板
+        :param pos: 绘制位置
+        """
+        self.key = key
+        self.template = template
+        self.pos = pos
+        self.value = None
+        self.image = None
+
+    def update(self, game_info):
+        """
+        数值变化时重新拼接标签
+        :param game_info: 游戏信息
+        """
+        value = game_info.get(self.key, 0)
+        if value != self.value:
+            self.value = value
+            self.image = get_atlas().draw_label(self.template.format(value))
+
+    def draw(self, surface):
+        """
+        绘图函数
+        :param surface: 绘图设备
+        """
+        surface.blit(self.image, self.pos)
+
 
 class Info:
     """ 文字信息类 """
@@ -49,34 +200,32 @@ class Info:
         self.info_labels.append((self.create_label('MARIO'), (75, 30)))
         self.info_labels.append((self.create_label('WORLD'), (450, 30)))
         self.info_labels.append((self.create_label('TIME'), (625, 30)))
-        self.info_labels.append((self.create_label('000000'), (75, 55)))
-        self.info_labels.append((self.create_label('x00'), (300, 55)))
         self.info_labels.append((self.create_label('1 - 1'), (480, 55)))
+        # 积分和硬币数随游戏进行而变化
+        self.hud_fields = [HudField('score', '{:06d}', (75, 55)), HudField('coin', 'x{:02d}', (300, 55))]
+        for field in self.hud_fields:
+            field.update(self.game_info)
 
     def create_label(self, label, size=40, width_scale=1.25, height_scale=1):
         """
-        创建单个文字标签的函数
+        创建单个文字标签的函数，标签由字形图集中的字形拼接而成
         :param label: 待创建标签的文字内容
         :param size: 字体大小
         :param width_scale: 标签宽系数
         :param height_scale: 标签高系数
         :return: 标签图片
         """
-        # 初始化字体
-        font = pygame.font.SysFont(C.FONT, size)
-        # 创建文字对象
-        label_image = font.render(label, False, (255, 255, 255))
-        # 获取文字对象的矩形范围信息
-        rect = label_image.get_rect()
-        # 文字缩放为图片
-        label_image = pygame.transform.scale(label_image, (int(rect.width * width_scale),
-                                                           int(rect.height * height_scale)))
-        return label_image
-
-    def update(self):
-        """ 信息更新函数 """
+        return get_atlas(size, width_scale, height_scale).render(label)
+
+    def update(self, current_time):
+        """
+        信息更新函数
+        :param current_time: 当前游戏时间
+        """
         # TODO: 信息的记录和更新逻辑有待补充(主要是积分逻辑)
-        self.flash_coin.update()  # 金币的闪烁
+        for field in self.hud_fields:
+            field.update(self.game_info)
+        self.flash_coin.update(current_time)  # 金币的闪烁
 
     def draw(self, surface):
         """
@@ -87,6 +236,8 @@ class Info:
             surface.blit(label[0], label[1])
         for label in self.info_labels:
             surface.blit(label[0], label[1])
+        for field in self.hud_fields:
+            field.draw(surface)
         surface.blit(self.flash_coin.image, self.flash_coin.rect)
         if self.state == 'load_screen':  # 加载界面中需要绘制马里奥图片
             surface.blit(self.player_image, (300, 270))
@@ -12,6 +12,25 @@ from .. import constants as C
 from . import powerup
 
 
+# 帧图片库：玩家名称 -> {帧组名: (朝右的帧序列, 朝左的帧序列)}，同名玩家的所有实例共用
+frame_banks = {}
+
+
+def load_frame_bank(frame_rects):
+    """
+    依据数据文件从图片文件中截取各种状态对应的帧图片
+    :param frame_rects: 帧组名 -> 帧矩形范围序列
+    :return: 帧组名 -> (朝右的帧序列, 朝左的帧序列)
+    """
+    sheet = setup.GRAPHICS['mario_bros']
+    bank = {}
+    for group, group_frame_rects in frame_rects.items():
+        rects = [(r['x'], r['y'], r['width'], r['height']) for r in group_frame_rects]
+        bank[group] = (tuple(tools.get_image(sheet, *rect, C.PLAYER_MULTI) for rect in rects),
+                       tuple(tools.get_image(sheet, *rect, C.PLAYER_MULTI, flip=True) for rect in rects))
+    return bank
+
+
 class Player(pygame.sprite.Sprite):
     """ 玩家类，继承pygame精灵类"""
 
@@ -79,16 +98,14 @@ class Player(pygame.sprite.Sprite):
         self.last_fireball_timer = 0  # 射击计时器(为了防止射击频率过快而设置)
 
     def load_images(self):
-        """ 载入图片 """
-        sheet = setup.GRAPHICS['mario_bros']
-        frame_rects = self.player_data['image_frames']
+        """ 载入图片，帧图片从帧图片库中取出，同名玩家的所有实例共用同一组帧图片 """
+        bank = frame_banks.get(self.name)
+        if bank is None:
+            bank = frame_banks[self.name] = load_frame_bank(self.player_data['image_frames'])
         # 将各种状态下的各种帧图片分类
-        self.right_small_normal_frames = []
-        self.right_big_normal_frames = []
-        self.right_big_fire_frames = []
-        self.left_small_normal_frames = []
-        self.left_big_normal_frames = []
-        self.left_big_fire_frames = []
+        self.right_small_normal_frames, self.left_small_normal_frames = bank['right_small_normal']
+        self.right_big_normal_frames, self.left_big_normal_frames = bank['right_big_normal']
+        self.right_big_fire_frames, self.left_big_fire_frames = bank['right_big_fire']
         # 帧图片列表分组
         self.small_normal_frames = [self.right_small_normal_frames, self.left_small_normal_frames]
         self.big_normal_frames = [self.right_big_normal_frames, self.left_big_normal_frames]
@@ -105,21 +122,6 @@ class Player(pygame.sprite.Sprite):
         # 初始化现行使用的帧图片
         self.right_frames = self.right_small_normal_frames
         self.left_frames = self.left_small_normal_frames
-        # 依据数据文件从图片文件中截取各种状态对应的帧图片
-        for group, group_frame_rects in frame_rects.items():
-            for frame_rect in group_frame_rects:
-                right_image = tools.get_image(sheet, frame_rect['x'], frame_rect['y'],
-                                              frame_rect['width'], frame_rect['height'], C.PLAYER_MULTI)
-                left_image = pygame.transform.flip(right_image, True, False)
-                if group == 'right_small_normal':
-                    self.right_small_normal_frames.append(right_image)
-                    self.left_small_normal_frames.append(left_image)
-                elif group == 'right_big_normal':
-                    self.right_big_normal_frames.append(right_image)
-                    self.left_big_normal_frames.append(left_image)
-                elif group == 'right_big_fire':
-                    self.right_big_fire_frames.append(right_image)
-                    self.left_big_fire_frames.append(left_image)
         # 初始化帧序号和当前帧序列
         self.frame_index = 0
         self.frames = self.right_frames
@@ -133,7 +135,7 @@ class Player(pygame.sprite.Sprite):
         :param keys: 键盘信号
         :param level: 关卡对象
         """
-        self.current_time = pygame.time.get_ticks()  # 获取当前时间
+        self.current_time = level.current_time  # 获取当前游戏时间
         self.handle_states(keys, level)  # 处理当前状态
         self.is_hurt_immune()  # 判断是否免疫伤害
 
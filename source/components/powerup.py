@@ -59,7 +59,7 @@ class Powerup(pygame.sprite.Sprite):
         强化道具更新函数
         :param level: 关卡对象
         """
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = level.current_time
         self.update_position(level)
 
     def update_position(self, level):
@@ -81,7 +81,7 @@ class Powerup(pygame.sprite.Sprite):
         :param level: 关卡对象
         """
         # 反弹逻辑
-        sprite = pygame.sprite.spritecollideany(self, level.ground_items_group)
+        sprite = level.solids.collide(self, ('ground',))
         if sprite:
             if self.direction:  # 向右
                 self.direction = 0
@@ -96,8 +96,7 @@ class Powerup(pygame.sprite.Sprite):
         y方向碰撞检测
         :param level: 关卡对象
         """
-        check_group = pygame.sprite.Group(level.ground_items_group, level.box_group, level.brick_group)
-        sprite = pygame.sprite.spritecollideany(self, check_group)
+        sprite = level.solids.collide(self, ('ground', 'box', 'brick'))
         if sprite:
             if self.rect.bottom > sprite.rect.top:
                 self.rect.bottom = sprite.rect.top
@@ -163,7 +162,7 @@ class FireFlower(Powerup):
             self.rect.y += self.y_vel
             if self.rect.bottom < self.origin_y:
                 self.state = 'rest'
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = level.current_time
         if self.timer == 0:
             self.timer = self.current_time
         if self.current_time - self.timer > 30:
@@ -200,7 +199,7 @@ class Fireball(Powerup):
         更新函数
         :param level: 关卡对象
         """
-        self.current_time = pygame.time.get_ticks()
+        self.current_time = level.current_time
         if self.state == 'fly':
             self.y_vel += self.gravity
             if self.current_time - self.timer > 200:
@@ -238,13 +237,13 @@ class Fireball(Powerup):
         :param level: 关卡对象
         """
         # 火球碰到障碍物爆炸
-        sprite = pygame.sprite.spritecollideany(self, level.ground_items_group)
+        sprite = level.solids.collide(self, ('ground',))
         if sprite:
             self.frame_index = 4
             self.state = 'boom'
             self.y_vel = 0
         # 火球碰到怪物之后杀死怪物并爆炸
-        enemy = pygame.sprite.spritecollideany(self, level.enemy_group)
+        enemy = level.enemy_group.collide(self)
         if enemy:
             self.frame_index = 4
             self.state = 'boom'
@@ -259,8 +258,7 @@ class Fireball(Powerup):
         :param level: 关卡对象
         """
         # y方向撞到障碍物反弹
-        check_group = pygame.sprite.Group(level.ground_items_group, level.box_group, level.brick_group)
-        sprite = pygame.sprite.spritecollideany(self, check_group)
+        sprite = level.solids.collide(self, ('ground', 'box', 'brick'))
         if sprite:
             if self.rect.bottom > sprite.rect.top:
                 self.rect.bottom = sprite.rect.top
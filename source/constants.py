@@ -6,13 +6,34 @@ __author__ = 201220014@smail.nju.edu.cn
 
 SCREEN_W, SCREEN_H = 800, 600  # 游戏窗口宽高
 
+FPS = 60  # 逻辑帧率：游戏逻辑每秒钟固定更新的次数
+RENDER_FPS = 120  # 渲染帧率上限(固定步长模式下有效)，渲染比逻辑步快时在两个逻辑步之间插值绘制
+MAX_FRAME_STEPS = 5  # 固定步长模式下每个渲染帧最多追赶的逻辑步数，超出部分直接丢弃
+
+PROFILE_SIZE = 600  # 帧耗时分析器为每个阶段保留的最近样本数(60帧每秒下约10秒)
+
+HEADLESS_ENV = 'SUPERMARIO_HEADLESS'  # 设置了该环境变量时以无窗口模式(SDL虚拟显示驱动)启动游戏
+
+COLLISION_CELL = 128  # 障碍物空间哈希的网格边长(像素)
+ACTIVE_MARGIN = 400  # 窗口两侧的活动范围(像素)，范围之外的敌人和道具休眠
+CONTACT_MARGIN = 16  # 批量碰撞检测时动态精灵的矩形向四周扩展的距离(像素)，覆盖精灵在一个逻辑步内的移动
+CONTACT_BATCH = 3  # 至少有这么多动态精灵需要碰撞检测时才做批量碰撞检测，更少时打包的开销超过省下的查询
+INTERPOLATE_MARGIN = 16  # 插值绘制时记录位置的范围比窗口向四周多出的距离(像素)，覆盖精灵在一个逻辑步内的移动
+
+ASSET_BUDGET = 16 * 1024 * 1024  # 资源管理器缓存的派生图片(放缩好的背景分块等)最多占用的字节数
+
 BG_MULTI = 2.68  # 背景图放缩系数
+BG_TILE = 256  # 背景分块宽度(放缩后的像素)
+BG_AHEAD = 400  # 窗口右侧预先放缩背景分块的距离(像素)
+BG_BEHIND = 256  # 窗口左侧保留背景分块的距离(像素)，更远的分块交还给资源管理器
+LAYER_CHUNK = 256  # 砖块和宝箱静态图层的分块边长(像素)
 PLAYER_MULTI = 2.9  # 玩家图片放缩系数
 BRICK_MULTI = 2.69  # 砖块图片放缩系数
 ENEMY_MULTI = 2.5  # 敌人图片放缩系数
 POWERUP_MULTI = 2.5  # 强化道具图片放缩系数
 
 FONT = 'FixedSys.ttf'  # 字体文件名
+LABEL_CACHE = 32  # 每个字形图集最多缓存的文字标签数
 
 GRAVITY = 1.0  # 重力加速度
 ANTI_GRAVITY = 0.3  # 阻力加速度
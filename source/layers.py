@@ -0,0 +1,154 @@
+"""
+静态图层：停在原位的砖块和宝箱预先合成到按地图坐标划分的分块上，绘制时每个分块只需要一次blit
+分块是地图上边长C.LAYER_CHUNK的正方形区域，关卡开始时合成一次，分块图片只覆盖其中砖块和宝箱所在的范围，与窗口位置无关。
+被顶起或者顶碎的砖块和宝箱由关卡从图层中取出(lift)，作为动态精灵逐个绘制，回到原位静止满一个逻辑步之后在逻辑步中合成回去
+(插值绘制时刚落回原位的精灵还要在上一个逻辑步的位置和原位之间插值)；
+合成在图层上的精灵换了图片(比如闪烁的宝箱)时，同样在逻辑步中只重新合成它所在的区域，绘制时从不合成分块。
+相邻的砖块和宝箱会重叠一列像素，为了和逐个绘制的结果完全相同：分块内按绘制顺序(先砖块后宝箱，组内按加入顺序)合成，
+与逐个绘制的精灵重叠、并且排在它后面的静止精灵要在它之后重画一遍(见Level.draw_group)。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import pygame
+
+from . import constants as C
+
+TILE_NAMES = ('brick', 'box')  # 参与合成的精灵(碎砖块一直在动，不参与)
+STATIC_STATES = ('rest', 'open')  # 砖块和宝箱停在原位时的状态
+
+
+def settled(sprite):
+    """
+    精灵是否停在原位
+    :param sprite: 砖块或宝箱
+    """
+    return sprite.state in STATIC_STATES and sprite.rect.topleft == (sprite.x, sprite.y)
+
+
+class Chunk:
+    """ 静态图层的分块 """
+
+    def __init__(self, area, sprites):
+        """
+        分块构造函数
+        :param area: 分块区域(地图坐标)
+        :param sprites: 原位与分块区域相交的砖块和宝箱，按绘制顺序排列
+        """
+        self.sprites = sprites
+        self.rect = sprites[0].rect.unionall([sprite.rect for sprite in sprites[1:]]).clip(area)
+        self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        # 分块大部分是透明的，RLE编码之后blit只需处理不透明的像素，否则逐像素混合整个分块反而比逐个绘制精灵慢
+        self.image.set_alpha(255, pygame.RLEACCEL)
+
+    def compose(self, baked, region):
+        """
+        重新合成分块中的一个区域
+        :param baked: 合成在图层上的精灵
+        :param region: 区域(地图坐标)
+        """
+        region = region.clip(self.rect)
+        if not region.width or not region.height:
+            return
+        x, y = self.rect.topleft
+        local = region.move(-x, -y)
+        self.image.fill((0, 0, 0, 0), local)
+        self.image.set_clip(local)
+        self.image.blits([(sprite.image, sprite.rect.move(-x, -y)) for sprite in self.sprites
+                          if sprite in baked and sprite.rect.colliderect(region)], False)
+        self.image.set_clip(None)
+
+
+class StaticLayer:
+    """ 砖块和宝箱的静态图层 """
+
+    def __init__(self, groups, chunk_size=C.LAYER_CHUNK):
+        """
+        静态图层构造函数，关卡设置好砖块和宝箱之后创建，所有分块在这里合成一次
+        :param groups: 障碍物精灵组，按绘制顺序排列
+        :param chunk_size: 分块边长(像素)
+        """
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (列, 行) -> 分块
+        self.homes = {}  # 砖块和宝箱 -> 原位所在的分块列表
+        self.baked = {}  # 合成在图层上的精灵 -> 合成时的图片
+        self.lifted = {}  # 从图层中取出、等待重新静止的精灵 -> 上一个逻辑步是否已经停在原位
+        members = {}
+        for group in groups:
+            for sprite in group:
+                if sprite.name not in TILE_NAMES:
+                    continue
+                for key in self.keys_of(sprite.rect):
+                    members.setdefault(key, []).append(sprite)
+                if settled(sprite):
+                    self.baked[sprite] = sprite.image
+                else:
+                    self.lifted[sprite] = False
+        size = chunk_size
+        for key, sprites in members.items():
+            chunk = self.chunks[key] = Chunk(pygame.Rect(key[0] * size, key[1] * size, size, size), sprites)
+            chunk.compose(self.baked, chunk.rect)
+            for sprite in sprites:
+                self.homes.setdefault(sprite, []).append(chunk)
+
+    def keys_of(self, rect):
+        """
+        矩形覆盖的分块
+        :param rect: 矩形(地图坐标)
+        :return: 分块坐标列表
+        """
+        size = self.chunk_size
+        left, top = rect.left // size, rect.top // size
+        right, bottom = max(rect.right - 1, rect.left) // size, max(rect.bottom - 1, rect.top) // size
+        return [(x, y) for x in range(left, right + 1) for y in range(top, bottom + 1)]
+
+    def recompose(self, sprite):
+        """
+        重新合成精灵原位所在的区域
+        :param sprite: 砖块或宝箱
+        """
+        region = pygame.Rect((sprite.x, sprite.y), sprite.rect.size)
+        for chunk in self.homes[sprite]:
+            chunk.compose(self.baked, region)
+
+    def lift(self, sprite):
+        """
+        把精灵从图层中取出，在它被顶起或者顶碎之前调用
+        :param sprite: 砖块或宝箱
+        """
+        if sprite in self.baked:
+            del self.baked[sprite]
+            self.lifted[sprite] = False
+            self.recompose(sprite)
+
+    def update(self):
+        """ 每个逻辑步在砖块和宝箱更新之后调用：重新静止的精灵合成回去，换了图片的精灵重新合成所在的区域 """
+        for sprite, was_settled in list(self.lifted.items()):
+            if not sprite.alive():  # 被顶碎了
+                del self.lifted[sprite]
+                for chunk in self.homes.pop(sprite):
+                    chunk.sprites.remove(sprite)
+            elif not settled(sprite):
+                self.lifted[sprite] = False
+            elif was_settled:
+                del self.lifted[sprite]
+                self.baked[sprite] = sprite.image
+                self.recompose(sprite)
+            else:
+                self.lifted[sprite] = True
+        for sprite in [sprite for sprite, image in self.baked.items() if sprite.image is not image]:
+            self.baked[sprite] = sprite.image
+            self.recompose(sprite)
+
+    def draw(self, surface, view, offset):
+        """
+        绘制窗口内的分块
+        :param surface: 绘图设备
+        :param view: 窗口矩形(地图坐标)
+        :param offset: 地图坐标到屏幕坐标的偏移
+        :return: blit的次数
+        """
+        chunks = self.chunks
+        blits = [(chunk.image, chunk.rect.move(offset)) for chunk in map(chunks.get, self.keys_of(view))
+                 if chunk is not None and chunk.rect.colliderect(view)]
+        surface.blits(blits, False)
+        return len(blits)
@@ -0,0 +1,305 @@
+"""
+地图编译器：把json地图数据校验后编译成紧凑的二进制格式
+每类地图元素编译成一张由32位整数组成的表，一行对应一个元素，列的顺序由SCHEMA规定。
+字段值必须是整数(或者值为整数的浮点数，比如1.0)，最小的两个32位整数保留给ABSENT和NULL，
+用来区分没有写的可选字段和显式写成null的可选字段。
+编译结果保存在.cache/maps中，通过内存映射读取，同时按照json文件的修改时间缓存在内存里，重新开始关卡时不用再解析地图。
+文件格式(小端序)：
+    文件头: 魔数b'SMLV'(4字节) + 版本号(1字节) + 表数(1字节) + 背景图名长度(2字节)
+            + 源文件修改时间(8字节，纳秒) + 源文件大小(4字节)，后接背景图名(utf-8)
+    每张表: 表名(16字节) + 列数(1字节) + 行数(4字节)，后接 行数x列数 个32位整数
+预先编译所有地图(在仓库根目录下运行)：
+    python -m source.maps
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAP_DIR = 'source/data/maps'
+CACHE_DIR = os.path.join('.cache', 'maps')
+MAGIC = b'SMLV'
+VERSION = 2
+HEADER = struct.Struct('<4sBBHQI')  # 魔数、版本号、表数、背景图名长度、源文件修改时间、源文件大小
+TABLE = struct.Struct('<16sBI')  # 表名、列数、行数
+INT = struct.Struct('<i')
+ABSENT = -2 ** 31  # 没有写的可选字段(比如砖块没有brick_num、检查点没有对应的敌人组)
+NULL = ABSENT + 1  # 显式写成null的可选字段
+
+# 每类地图元素的列：(字段名, 缺省值)，缺省值为None的字段是必填的，
+# 可选字段写成null时：缺省值为ABSENT的字段记为NULL(与没有写区分开)，其余字段按缺省值处理
+RECT = (('x', None), ('y', None), ('width', None), ('height', None))
+SCHEMA = {
+    'maps': (('start_x', None), ('end_x', None), ('player_x', None), ('player_y', None)),
+    'ground': RECT,
+    'pipe': RECT + (('type', 0),),
+    'step': RECT,
+    'slider': (('x', None), ('y', None), ('num', 1), ('direction', 0), ('range_start', 0), ('range_end', 0),
+               ('velocity', 0)),
+    'coin': (('x', None), ('y', None)),
+    'brick': (('x', None), ('y', None), ('type', None), ('color', 0), ('direction', 0), ('brick_num', ABSENT)),
+    'box': (('x', None), ('y', None), ('type', None)),
+    'enemy_group': (('group_id', None), ('index', None)),  # 敌人组编号及其所在的敌人组字典的序号
+    'enemy': (('group_id', None), ('x', None), ('y', None), ('direction', None), ('type', None), ('color', None),
+              ('num', 1), ('range', 0), ('range_start', 0), ('range_end', 0), ('is_vertical', 0)),
+    'checkpoint': RECT + (('type', None), ('enemy_groupid', ABSENT), ('map_index', 0)),
+    'flagpole': (('x', None), ('y', None), ('type', None))
+}
+REQUIRED = ('enemy', 'checkpoint')  # 必须出现的元素，其余元素可以没有
+
+
+class LevelData:
+    """ 编译好的地图数据 """
+
+    def __init__(self, image_name, tables, buffer=None):
+        """
+        地图数据构造函数
+        :param image_name: 背景图名
+        :param tables: 表名 -> 整数序列(按行依次排列)
+        :param buffer: 表所引用的内存映射，随地图数据一起保留
+        """
+        self.image_name = image_name
+        self.tables = tables
+        self.buffer = buffer
+
+    def __contains__(self, name):
+        return len(self.tables.get(name, ())) > 0
+
+    def count(self, name):
+        """
+        元素个数
+        :param name: 表名
+        """
+        return len(self.tables.get(name, ())) // len(SCHEMA[name])
+
+    def rows(self, name):
+        """
+        按行读取表
+        :param name: 表名
+        :return: 每行一个整数元组的迭代器，列的顺序见SCHEMA
+        """
+        values = self.tables.get(name, ())
+        return zip(*[iter(values)] * len(SCHEMA[name]))
+
+
+def field_value(item, field, default, where):
+    """
+    读取并校验一个字段
+    :param item: 元素数据字典
+    :param field: 字段名
+    :param default: 缺省值，为None时字段必填
+    :param where: 出错时提示的位置
+    :return: 整数，见SCHEMA上方关于ABSENT和NULL的说明
+    """
+    if field not in item:
+        if default is None:
+            raise ValueError('{}: 缺少字段{}'.format(where, field))
+        return default
+    value = item[field]
+    if value is None:
+        if default is None:
+            raise ValueError('{}: 缺少字段{}'.format(where, field))
+        return NULL if default == ABSENT else default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('{}: 字段{}应为整数，实际为{!r}'.format(where, field, value))
+    if not NULL < value < 2 ** 31:
+        raise ValueError('{}: 字段{}超出范围'.format(where, field))
+    return value
+
+
+def table_rows(map_data, path):
+    """
+    把json地图数据整理成各张表的行，同时校验数据
+    :param map_data: json地图数据
+    :param path: 地图文件路径，出错时提示
+    :return: 表名 -> 行列表
+    """
+    for name in REQUIRED:
+        if not isinstance(map_data.get(name), list):
+            raise ValueError('{}: 缺少{}'.format(path, name))
+    items = {name: map_data.get(name, []) for name in SCHEMA}
+    # 敌人数据是一组字典，字典的键为敌人组编号，值为该组的敌人列表，编译时展开成两张表
+    items['enemy_group'] = []
+    items['enemy'] = []
+    for index, group_data in enumerate(map_data['enemy']):
+        if not isinstance(group_data, dict):
+            raise ValueError('{}: enemy[{}]应为字典'.format(path, index))
+        for group_id, enemy_list in group_data.items():
+            if not group_id.lstrip('-').isdigit():
+                raise ValueError('{}: 敌人组编号{!r}应为整数'.format(path, group_id))
+            items['enemy_group'].append({'group_id': int(group_id), 'index': index})
+            items['enemy'].extend(dict(enemy_data, group_id=int(group_id)) for enemy_data in enemy_list)
+    rows = {}
+    for name, fields in SCHEMA.items():
+        if not isinstance(items[name], list):
+            raise ValueError('{}: {}应为列表'.format(path, name))
+        rows[name] = []
+        for i, item in enumerate(items[name]):
+            where = '{}: {}[{}]'.format(path, name, i)
+            if not isinstance(item, dict):
+                raise ValueError('{}应为字典'.format(where))
+            rows[name].append([field_value(item, field, default, where) for field, default in fields])
+    # 检查点刷新的敌人组必须存在
+    group_ids = {row[0] for row in rows['enemy_group']}
+    for i, row in enumerate(rows['checkpoint']):
+        checkpoint_type, group_id = row[4], row[5]
+        if checkpoint_type == 0 and group_id not in group_ids:
+            raise ValueError('{}: checkpoint[{}]对应的敌人组{}不存在'.format(path, i, group_id))
+    return rows
+
+
+def compile_map(map_data, path, source_stat=None):
+    """
+    编译地图数据
+    :param map_data: json地图数据
+    :param path: 地图文件路径，出错时提示
+    :param source_stat: 地图文件的os.stat()结果，记录在文件头中用来判断编译结果是否过期
+    :return: 二进制数据
+    """
+    image_name = map_data.get('image_name')
+    if not isinstance(image_name, str) or not image_name:
+        raise ValueError('{}: 缺少image_name'.format(path))
+    rows = table_rows(map_data, path)
+    name_bytes = image_name.encode()
+    mtime, size = (source_stat.st_mtime_ns, source_stat.st_size) if source_stat else (0, 0)
+    chunks = [HEADER.pack(MAGIC, VERSION, len(rows), len(name_bytes), mtime, size), name_bytes]
+    for name, table in rows.items():
+        chunks.append(TABLE.pack(name.encode(), len(SCHEMA[name]), len(table)))
+        values = array('i', [value for row in table for value in row])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        chunks.append(values.tobytes())
+    return b''.join(chunks)
+
+
+def parse(buffer, path):
+    """
+    解析编译好的地图数据，表直接引用buffer中的内存，不复制
+    :param buffer: 二进制数据，需要支持缓冲区协议
+    :param path: 文件路径，出错时提示
+    :return: (源文件修改时间, 源文件大小, 地图数据)
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError('{} 地图文件已损坏'.format(path))
+    magic, version, table_count, name_size, mtime, size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('{} 不是有效的地图文件'.format(path))
+    offset = HEADER.size
+    image_name = bytes(view[offset:offset + name_size]).decode()
+    offset += name_size
+    tables = {}
+    for _ in range(table_count):
+        if offset + TABLE.size > len(view):
+            raise ValueError('{} 地图文件已损坏'.format(path))
+        name, columns, row_count = TABLE.unpack_from(view, offset)
+        name = name.rstrip(b'\0').decode()
+        offset += TABLE.size
+        end = offset + columns * row_count * INT.size
+        if name not in SCHEMA or columns != len(SCHEMA[name]) or end > len(view):
+            raise ValueError('{} 地图文件已损坏'.format(path))
+        if sys.byteorder == 'little':
+            tables[name] = view[offset:end].cast('i')
+        else:
+            tables[name] = array('i')
+            tables[name].frombytes(view[offset:end])
+            tables[name].byteswap()
+        offset = end
+    if offset != len(view):
+        raise ValueError('{} 地图文件已损坏'.format(path))
+    return mtime, size, LevelData(image_name, tables, buffer)
+
+
+def compiled_path(path, cache_dir=CACHE_DIR):
+    """
+    地图文件对应的编译结果路径
+    :param path: 地图文件路径
+    :param cache_dir: 编译结果所在文件夹
+    """
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.bin')
+
+
+def read_compiled(path, source_stat, cache_dir=CACHE_DIR):
+    """
+    通过内存映射读取编译结果
+    :param path: 地图文件路径
+    :param source_stat: 地图文件的os.stat()结果
+    :param cache_dir: 编译结果所在文件夹
+    :return: 地图数据，编译结果不存在、已损坏或者已经过期时返回None
+    """
+    try:
+        with open(compiled_path(path, cache_dir), 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mtime, size, level_data = parse(buffer, path)
+    except (OSError, ValueError):
+        return None
+    if (mtime, size) != (source_stat.st_mtime_ns, source_stat.st_size):
+        return None
+    return level_data
+
+
+def build(path, source_stat, cache_dir=CACHE_DIR):
+    """
+    编译地图文件并保存编译结果，无法写入缓存文件夹时只在内存中使用编译结果
+    :param path: 地图文件路径
+    :param source_stat: 地图文件的os.stat()结果
+    :param cache_dir: 编译结果所在文件夹
+    :return: 地图数据
+    """
+    with open(path) as f:
+        data = compile_map(json.load(f), path, source_stat)
+    target = compiled_path(path, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+    except OSError:
+        pass
+    return parse(data, path)[2]
+
+
+loaded = {}  # 地图文件路径 -> (修改时间, 文件大小, 地图数据)
+
+
+def load(path, cache_dir=CACHE_DIR):
+    """
+    读取地图数据：内存中的缓存 > 磁盘上的编译结果 > 重新编译，地图文件修改后自动重新编译
+    :param path: json地图文件路径
+    :param cache_dir: 编译结果所在文件夹
+    :return: 地图数据
+    """
+    stat = os.stat(path)
+    cached = loaded.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    level_data = read_compiled(path, stat, cache_dir) or build(path, stat, cache_dir)
+    loaded[path] = (stat.st_mtime_ns, stat.st_size, level_data)
+    return level_data
+
+
+def main():
+    """ 编译所有地图 """
+    failed = 0
+    for file_name in sorted(os.listdir(MAP_DIR)):
+        if not file_name.endswith('.json'):
+            continue
+        path = os.path.join(MAP_DIR, file_name)
+        try:
+            build(path, os.stat(path))
+        except ValueError as e:
+            print(e)
+            failed += 1
+            continue
+        print('{} -> {} ({} bytes)'.format(path, compiled_path(path), os.path.getsize(compiled_path(path))))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+帧耗时分析器
+按阶段统计每一帧的耗时，每个阶段的耗时存放在固定大小的环形缓冲区里，只保留最近的若干帧。
+可以在屏幕上显示各阶段耗时的分位数，也可以在退出时导出为json文件。
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import json
+from array import array
+from time import perf_counter
+
+import pygame
+
+from . import constants as C
+
+TOGGLE_KEY = pygame.K_F3  # 切换耗时面板显示的按键
+
+
+class PhaseBuffer:
+    """ 单个阶段的环形缓冲区，记录最近若干次的耗时(毫秒) """
+
+    def __init__(self, size):
+        """
+        环形缓冲区构造函数
+        :param size: 缓冲区大小
+        """
+        self.samples = array('d', bytes(8 * size))
+        self.size = size
+        self.index = 0  # 下一个写入的位置
+        self.count = 0  # 已经写入的样本数(不超过缓冲区大小)
+
+    def add(self, duration):
+        """
+        写入一个样本
+        :param duration: 耗时(毫秒)
+        """
+        self.samples[self.index] = duration
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def stats(self):
+        """
+        统计缓冲区中的样本
+        :return: 样本数、平均值、p50/p95/p99分位数和最大值组成的字典
+        """
+        samples = sorted(self.samples[:self.count])
+        if not samples:
+            return {'count': 0, 'mean': 0, 'p50': 0, 'p95': 0, 'p99': 0, 'max': 0}
+        return {
+            'count': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'p99': percentile(samples, 99),
+            'max': samples[-1]
+        }
+
+
+class Phase:
+    """ 阶段计时器，用with语句包住需要计时的代码 """
+
+    def __init__(self, buffer):
+        """
+        阶段计时器构造函数
+        :param buffer: 该阶段的环形缓冲区
+        """
+        self.buffer = buffer
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.buffer.add((perf_counter() - self.start) * 1000)
+
+
+class NullPhase:
+    """ 分析器关闭时使用的空计时器 """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+def percentile(samples, p):
+    """
+    最近秩法计算分位数
+    :param samples: 升序排列的样本
+    :param p: 百分位(0~100)
+    :return: 分位数
+    """
+    rank = max(int(round(p / 100 * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+class Profiler:
+    """ 帧耗时分析器 """
+
+    def __init__(self, size=C.PROFILE_SIZE, enabled=True):
+        """
+        分析器构造函数
+        :param size: 每个阶段的环形缓冲区大小
+        :param enabled: 是否启用，关闭时所有计时都是空操作
+        """
+        self.size = size
+        self.enabled = enabled
+        self.buffers = {}  # 阶段名 -> 环形缓冲区，按第一次出现的顺序排列
+        self.phases = {}  # 阶段名 -> 阶段计时器
+        self.overlay = False  # 是否在屏幕上显示耗时面板
+        self.overlay_image = None  # 耗时面板图片
+        self.overlay_age = 0  # 耗时面板上次刷新之后经过的渲染帧数
+        self.font = None
+
+    def phase(self, name):
+        """
+        获取阶段计时器
+        :param name: 阶段名
+        :return: 可以用在with语句中的计时器
+        """
+        if not self.enabled:
+            return NULL_PHASE
+        phase = self.phases.get(name)
+        if phase is None:
+            self.buffers[name] = PhaseBuffer(self.size)
+            phase = self.phases[name] = Phase(self.buffers[name])
+        return phase
+
+    def stats(self):
+        """
+        统计各个阶段的耗时
+        :return: 阶段名 -> 统计结果
+        """
+        return {name: buffer.stats() for name, buffer in self.buffers.items()}
+
+    def dump(self, path, **sections):
+        """
+        将统计结果导出为json文件
+        :param path: 文件路径
+        :param sections: 需要一并导出的其他统计结果，比如启动时的图片加载耗时
+        """
+        with open(path, 'w') as f:
+            json.dump(dict({'unit': 'ms', 'size': self.size, 'phases': self.stats()}, **sections), f, indent=4)
+
+    def toggle_overlay(self):
+        """ 切换耗时面板的显示 """
+        self.overlay = not self.overlay
+        self.overlay_image = None
+
+    def draw(self, surface):
+        """
+        在屏幕左下角绘制耗时面板，面板每半秒刷新一次，避免每帧都重新渲染文字
+        :param surface: 绘图设备
+        """
+        if not self.overlay:
+            return
+        self.overlay_age += 1
+        if self.overlay_image is None or self.overlay_age >= C.FPS // 2:
+            self.overlay_image = self.render_overlay()
+            self.overlay_age = 0
+        surface.blit(self.overlay_image, (0, surface.get_height() - self.overlay_image.get_height()))
+
+    def render_overlay(self):
+        """
+        渲染耗时面板
+        :return: 面板图片
+        """
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        rows = [('phase (ms)', 'p50', 'p95', 'p99')]
+        for name, stats in self.stats().items():
+            rows.append((name, '{:.3f}'.format(stats['p50']), '{:.3f}'.format(stats['p95']),
+                         '{:.3f}'.format(stats['p99'])))
+        columns = (4, 200, 255, 310)  # 各列的横坐标
+        line_height = self.font.get_linesize()
+        image = pygame.Surface((370, line_height * len(rows) + 4))
+        image.set_alpha(200)
+        for i, row in enumerate(rows):
+            for x, text in zip(columns, row):
+                image.blit(self.font.render(text, True, (255, 255, 255)), (x, 2 + i * line_height))
+        return image
@@ -0,0 +1,181 @@
+"""
+按键录制与回放
+录像文件只记录游戏用到的几个按键，每一帧的按键状态压缩成一个比特掩码，连续相同的掩码再做游程编码。
+文件格式(小端序)：
+    文件头: 魔数b'SMKR'(4字节) + 版本号(1字节) + 逻辑帧率(1字节) + 总帧数(4字节)
+    游程:   重复帧数(2字节) + 按键掩码(1字节)，一直重复到文件末尾
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import struct
+
+import pygame
+
+from . import constants as C
+
+# 游戏用到的按键，序号即为该键在掩码中的比特位
+KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_RETURN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_a, pygame.K_s)
+KEY_BITS = {key: 1 << i for i, key in enumerate(KEYS)}
+
+MAGIC = b'SMKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBBI')  # 魔数、版本号、逻辑帧率、总帧数
+RUN = struct.Struct('<HB')  # 重复帧数、按键掩码
+MAX_RUN = 0xFFFF  # 单个游程最多记录的帧数，更长的游程拆成多个
+
+
+def encode_keys(keys):
+    """
+    将按键状态压缩为比特掩码
+    :param keys: 按键状态，可以是pygame.key.get_pressed()的返回值，也可以是KeyState对象
+    :return: 按键掩码
+    """
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+
+class KeyState:
+    """ 由按键掩码还原出来的按键状态，可以像pygame.key.get_pressed()的返回值一样用按键常量取值 """
+
+    def __init__(self, mask):
+        """
+        按键状态构造函数
+        :param mask: 按键掩码
+        """
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+# 所有可能的按键状态只有2^7种，预先创建好供回放时直接使用
+KEY_STATES = [KeyState(mask) for mask in range(1 << len(KEYS))]
+
+
+def save(path, runs, fps=C.FPS):
+    """
+    保存录像文件
+    :param path: 文件路径
+    :param runs: 游程序列，每一项为(重复帧数, 按键掩码)
+    :param fps: 录制时的逻辑帧率
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, fps, sum(count for count, _ in runs)))
+        for count, mask in runs:
+            while count > 0:
+                f.write(RUN.pack(min(count, MAX_RUN), mask))
+                count -= MAX_RUN
+
+
+def frame_count(path):
+    """
+    只读取文件头中的总帧数，不解码游程
+    :param path: 文件路径
+    :return: 总帧数，文件不是有效的录像时返回0
+    """
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return 0
+    magic, version, _, count = HEADER.unpack(data)
+    return count if magic == MAGIC and version == VERSION else 0
+
+
+def load(path):
+    """
+    读取录像文件
+    :param path: 文件路径
+    :return: (逻辑帧率, 游程序列)
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size or (len(data) - HEADER.size) % RUN.size:
+        raise ValueError('{} 录像文件已损坏'.format(path))
+    magic, version, fps, frame_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('{} 不是有效的录像文件'.format(path))
+    runs = list(RUN.iter_unpack(data[HEADER.size:]))
+    if sum(count for count, _ in runs) != frame_count:
+        raise ValueError('{} 录像文件已损坏'.format(path))
+    return fps, runs
+
+
+class Recorder:
+    """ 按键录制器，每个逻辑步记录一次按键状态 """
+
+    def __init__(self):
+        """ 录制器构造函数 """
+        self.runs = []  # 游程序列，每一项为[重复帧数, 按键掩码]
+
+    @property
+    def frame_count(self):
+        """ 已经录制的帧数 """
+        return sum(count for count, _ in self.runs)
+
+    def record(self, keys):
+        """
+        记录一帧的按键状态
+        :param keys: 按键状态
+        """
+        mask = encode_keys(keys)
+        if self.runs and self.runs[-1][1] == mask:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, mask])
+
+    def save(self, path):
+        """
+        保存录像
+        :param path: 文件路径
+        """
+        save(path, self.runs)
+
+
+class Replay:
+    """ 按键回放器，每个逻辑步取出一帧的按键状态 """
+
+    def __init__(self, runs, fps=C.FPS):
+        """
+        回放器构造函数
+        :param runs: 游程序列
+        :param fps: 录制时的逻辑帧率
+        """
+        if fps != C.FPS:
+            raise ValueError('录像的逻辑帧率为{}，与游戏的逻辑帧率{}不一致'.format(fps, C.FPS))
+        self.runs = runs
+        self.frame_count = sum(count for count, _ in runs)
+        self.frame = 0  # 已经回放的帧数
+        self.run_index = 0  # 当前游程的序号
+        self.run_left = runs[0][0] if runs else 0  # 当前游程剩余的帧数
+
+    @classmethod
+    def load(cls, path):
+        """
+        从录像文件创建回放器
+        :param path: 文件路径
+        :return: 回放器
+        """
+        fps, runs = load(path)
+        return cls(runs, fps)
+
+    @property
+    def finished(self):
+        """ 是否已经回放完毕 """
+        return self.frame >= self.frame_count
+
+    def next_keys(self):
+        """
+        取出下一帧的按键状态
+        :return: 按键状态，回放完毕后返回None
+        """
+        while self.run_left == 0:
+            self.run_index += 1
+            if self.run_index >= len(self.runs):
+                return None
+            self.run_left = self.runs[self.run_index][0]
+        self.run_left -= 1
+        self.frame += 1
+        return KEY_STATES[self.runs[self.run_index][1]]
@@ -3,11 +3,19 @@
 __author__ = 201220014@smail.nju.edu.cn
 """
 
+import os
 import pygame
 from . import constants as C
-from . import tools
+from . import tools, bake
 
+if os.environ.get(C.HEADLESS_ENV):
+    # 无窗口模式：使用SDL的虚拟显示和音频驱动，必须在初始化pygame之前设置
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 pygame.init()  # 初始化游戏硬件条件
 
 SCREEN = pygame.display.set_mode((C.SCREEN_W, C.SCREEN_H))  # 初始化游戏窗口
-GRAPHICS = tools.load_graphics('resources/graphics')  # 导入游戏所需所有图片
+GRAPHICS_DIR = 'resources/graphics'
+GRAPHICS = tools.LazyGraphics(GRAPHICS_DIR)  # 游戏所需所有图片，每张图片第一次用到的时候才加载
+BAKED = bake.BakedFrames.load(GRAPHICS_DIR)  # 烘焙缓存(见bake.py)，没有生成或者已经过期时为None
+tools.FRAME_CACHE.attach(GRAPHICS, BAKED)
@@ -3,12 +3,11 @@
 __author__ = 201220014@smail.nju.edu.cn
 """
 
-import json  # 处理JavaScrip Object Notation数据文件的库
 import os  # 标准输入输出库
 import pygame
 
 from .. import constants as C
-from .. import setup
+from .. import profiling, background, maps, collision, activation, layers
 from ..components import info, player, stuff, brick, box, enemy  # 游戏的各个组件
 
 
@@ -17,6 +16,23 @@ class Level:
     关卡类
     """
 
+    def __init__(self, clock, profiler=None, interpolate=False):
+        """
+        关卡类构造函数
+        :param clock: 游戏时钟
+        :param profiler: 帧耗时分析器，为None时不统计耗时
+        :param interpolate: 是否在两个逻辑步之间插值绘制所有精灵(固定步长模式)，关闭时只有窗口和玩家参与插值
+        """
+        self.clock = clock
+        self.profiler = profiler or profiling.Profiler(enabled=False)
+        self.interpolate = interpolate
+        self.last_positions = {}  # 窗口附近的精灵 -> 上一个逻辑步的位置，只在插值绘制时记录
+        self.background = None  # 分块背景
+        self.image_name = None  # 分块背景的图片名
+        self.drawn = 0  # 上一次绘制时画出的精灵数
+        self.culled = 0  # 上一次绘制时因为不在窗口内而跳过的精灵数
+        self.blits = 0  # 上一次绘制时画出精灵和静态图层分块的blit次数
+
     def start(self, game_info):
         """
         关卡类的驱动方法，不采用构造函数是为了切换关卡的时候无需创建新的对象
@@ -35,36 +51,38 @@ class Level:
         self.setup_bricks_and_boxes()
         self.setup_enemies()
         self.setup_checkpoints()
+        self.save_last_positions()
 
     def load_map_data(self):
-        """ 从json文件中载入地图数据，包括各个游戏组件的位置、大小等 """
-        file_name = 'level_1.json'
-        # TODO: 暂时只写了一个关卡，需要补充关卡之间的切换逻辑
-        file_path = os.path.join('source/data/maps', file_name)
-        with open(file_path) as f:
-            self.map_data = json.load(f)  # 载入json文件, 相当于一个字典
+        """ 载入地图数据，包括各个游戏组件的位置、大小等，json地图文件编译后缓存起来(见maps.py) """
+        file_name = 'level_{}.json'.format(self.game_info.get('level_num', 1))
+        # TODO: 暂时只写了关卡的选择(游戏信息中的level_num)，还需要补充关卡之间的切换逻辑
+        file_path = os.path.join(maps.MAP_DIR, file_name)
+        self.map_data = maps.load(file_path)
 
     def setup_background(self):
         """ 设置背景 """
-        # 根据数据文指示获取背景图
-        self.image_name = self.map_data['image_name']
-        self.background = setup.GRAPHICS[self.image_name]
-        # 放缩背景图以适应窗口
-        rect = self.background.get_rect()
-        self.background = pygame.transform.scale(self.background, (int(rect.width * C.BG_MULTI),
-                                                                   int(rect.height * C.BG_MULTI)))
+        # 根据数据文件指示创建分块背景，窗口靠近时才放缩分块，放缩好的分块由资源管理器缓存，所有关卡实例共用
+        image_name = self.map_data.image_name
+        if image_name != self.image_name:
+            if self.background is not None:
+                self.background.close()  # 换了背景图，之前持有的分块交还给资源管理器
+            self.background = background.TiledBackground(image_name)
+            self.image_name = image_name
         # 记录背景矩形信息
         self.background_rect = self.background.get_rect()
-        # 游戏窗口矩形信息
-        self.game_window = setup.SCREEN.get_rect()
-        # 游戏场景: 背景大小的空画布
-        self.game_ground = pygame.Surface((self.background_rect.width, self.background_rect.height))
+        # 游戏窗口矩形信息(与屏幕同样大小，但是不依赖于屏幕，不绘制的关卡也能运行)
+        self.game_window = pygame.Rect(0, 0, C.SCREEN_W, C.SCREEN_H)
+        # 第一帧之前放缩好初始窗口附近的分块；重新开始同一关时仍然持有的分块直接沿用，远处的分块交还
+        self.background.stream(self.game_window)
 
     def setup_start_position(self):
         """ 设置场景 始末位置 和 玩家 初始位置 """
         self.positions = []
-        for data in self.map_data['maps']:
-            self.positions.append((data['start_x'], data['end_x'], data['player_x'], data['player_y']))
+        # 没有场景数据的地图只有一个从头走到尾的场景
+        default_maps = [(0, self.background_rect.width, 110, 538)]
+        for data in self.map_data.rows('maps') if 'maps' in self.map_data else default_maps:
+            self.positions.append(data)  # (start_x, end_x, player_x, player_y)
         # TODO: 马里奥是有可能通过特殊的管道切换地图和场景的，这个功能有待实现，我暂时只能从开始进入场景
         self.start_x, self.end_x, self.player_x, self.player_y = self.positions[0]
 
@@ -77,26 +95,26 @@ class Level:
 
     def setup_ground_items(self):
         """ 设置地面障碍物 """
+        # 障碍物索引：地面物品、砖块和宝箱的碰撞检测都通过它进行
+        self.solids = collision.SolidIndex()
         # 初始化空的精灵组，使用精灵组是为了以后碰撞检测方便
-        self.ground_items_group = pygame.sprite.Group()
+        self.ground_items_group = collision.SolidGroup(self.solids, 'ground')
         for name in ['ground', 'pipe', 'step']:  # 障碍物包地面、管道和台阶
-            for item in self.map_data[name]:
-                self.ground_items_group.add(stuff.Item(item['x'], item['y'], item['width'], item['height'], name))
+            for x, y, w, h, *_ in self.map_data.rows(name):
+                self.ground_items_group.add(stuff.Item(x, y, w, h, name))
 
     def setup_bricks_and_boxes(self):
         """ 设置砖块和宝箱 """
-        self.brick_group = pygame.sprite.Group()  # 砖块组
-        self.box_group = pygame.sprite.Group()  # 宝箱组
+        self.brick_group = collision.SolidGroup(self.solids, 'brick')  # 砖块组
+        self.box_group = collision.SolidGroup(self.solids, 'box')  # 宝箱组
         # 硬币 和 强化道具 藏在砖块和宝箱中
         self.coin_group = pygame.sprite.Group()  # 硬币组
-        self.powerup_group = pygame.sprite.Group()  # 强化道具组(蘑菇、花、星星等)
+        self.powerup_group = collision.SweepGroup()  # 强化道具组(蘑菇、花、星星等)
         # 设置砖块
         if 'brick' in self.map_data:
-            for brick_data in self.map_data['brick']:
-                x, y = brick_data['x'], brick_data['y']
-                brick_type = brick_data['type']
+            for x, y, brick_type, _, _, brick_num in self.map_data.rows('brick'):
                 if brick_type == 0:  # 空砖块
-                    if 'brick_num' in brick_data:
+                    if brick_num != maps.ABSENT:  # 写了brick_num(包括null)
                         # TODO: 批量初始化砖块的功能有待实现
                         pass
                     else:
@@ -107,36 +125,38 @@ class Level:
                     self.brick_group.add(brick.Brick(x, y, brick_type, self.powerup_group, self))
         # 设置宝箱
         if 'box' in self.map_data:
-            for box_data in self.map_data['box']:
-                x, y = box_data['x'], box_data['y']
-                box_type = box_data['type']
+            for x, y, box_type in self.map_data.rows('box'):
                 if box_type == 1:  # 硬币宝箱
                     self.box_group.add(box.Box(x, y, box_type, self.coin_group, self))
                 else:  # 强化宝箱
                     self.box_group.add(box.Box(x, y, box_type, self.powerup_group, self))
+        # 停在原位的砖块和宝箱合成到静态图层上，绘制时按分块整块画出
+        self.static_layer = layers.StaticLayer((self.brick_group, self.box_group))
 
     def setup_enemies(self):
         """ 设置敌人，包括怪物、火球、子弹等等 """
         self.dying_group = pygame.sprite.Group()  # 死亡组
-        self.enemy_group = pygame.sprite.Group()  # 敌人组
-        self.shell_group = pygame.sprite.Group()  # 龟壳组(因为乌龟壳比较特殊)
+        self.enemy_group = collision.SweepGroup()  # 敌人组
+        self.shell_group = collision.SweepGroup()  # 龟壳组(因为乌龟壳比较特殊)
+        self.active = activation.ActiveRegion()  # 只有窗口附近的敌人、龟壳和强化道具参与更新
         # 根据敌人数据创建敌人对象
         self.enemy_group_dict = {}
-        for enemy_group_data in self.map_data['enemy']:
-            group = pygame.sprite.Group()
-            for enemy_group_id, enemy_list in enemy_group_data.items():
-                for enemy_data in enemy_list:
-                    group.add(enemy.create_enemy(enemy_data))
-                self.enemy_group_dict[enemy_group_id] = group
+        groups = {}  # 同一个敌人组字典中的敌人组编号共用一个精灵组
+        for enemy_group_id, index in self.map_data.rows('enemy_group'):
+            self.enemy_group_dict[str(enemy_group_id)] = groups.setdefault(index, pygame.sprite.Group())
+        for enemy_group_id, x, y, direction, enemy_type, color, *_ in self.map_data.rows('enemy'):
+            new_enemy = enemy.create_enemy({'x': x, 'y': y, 'direction': direction, 'type': enemy_type,
+                                            'color': color})
+            if new_enemy:
+                self.enemy_group_dict[str(enemy_group_id)].add(new_enemy)
 
     def setup_checkpoints(self):
         """ 设置检查点，马里奥走到检查点的时候刷新该处对应的怪物 """
         self.checkpoint_group = pygame.sprite.Group()  # 检查点组
         # 根据检查点数据创建检查点对象
-        for item in self.map_data['checkpoint']:
-            x, y, w, h = item['x'], item['y'], item['width'], item['height']
-            checkpoint_type = item['type']
-            enemy_groupid = item.get('enemy_groupid')
+        for x, y, w, h, checkpoint_type, enemy_groupid, _ in self.map_data.rows('checkpoint'):
+            if enemy_groupid in (maps.ABSENT, maps.NULL):
+                enemy_groupid = None
             self.checkpoint_group.add(stuff.Checkpoint(x, y, w, h, checkpoint_type, enemy_groupid))
 
     def update(self, surface, keys):
@@ -145,10 +165,14 @@ class Level:
         :param surface: 供更新的画布
         :param keys: 键盘信号
         """
-        # 获取当前帧数(相当于获取当前时间)
-        self.current_time = pygame.time.get_ticks()
+        # 获取当前游戏时间，关卡中的各个组件都从这里读取时间
+        self.current_time = self.clock.get_ticks()
+        # 记录上一个逻辑步的位置，供渲染插值使用
+        self.save_last_positions()
+        phase = self.profiler.phase  # 各阶段的耗时统计
         # 玩家更新
-        self.player.update(keys, self)
+        with phase('player.update'):
+            self.player.update(keys, self)
 
         if self.player.dead:
             if self.current_time - self.player.death_timer > 3000:
@@ -157,20 +181,55 @@ class Level:
         elif self.is_frozen():
             pass  # 马里奥变身时会暂停关卡
         else:
-            self.update_player_position()
-            self.check_checkpoints()
+            with phase('update_player_position'):
+                self.update_player_position()
+            with phase('check_checkpoints'):
+                self.check_checkpoints()
             self.check_if_go_die()
             self.update_game_window()
-            self.brick_group.update()
-            self.box_group.update()
-            self.enemy_group.update(self)
-            self.dying_group.update(self)
-            self.shell_group.update(self)
-            self.coin_group.update()
-            self.powerup_group.update(self)
+            self.active.follow(self.game_window, self.current_time)
+            with phase('brick_group.update'):
+                self.brick_group.update()
+            with phase('box_group.update'):
+                self.box_group.update()
+            self.solids.settle()  # 被顶起的砖块和宝箱落回原位后放回障碍物索引的网格
+            with phase('static_layer.update'):
+                self.static_layer.update()  # 落回原位的砖块和宝箱合成回静态图层
+            with phase('solids.prepare'):
+                self.solids.prepare(self.moving_sprites())
+            with phase('enemy_group.update'):
+                self.active.update(self.enemy_group, self)
+            with phase('dying_group.update'):
+                self.dying_group.update(self)
+            with phase('shell_group.update'):
+                self.active.update(self.shell_group, self)
+            with phase('coin_group.update'):
+                self.coin_group.update()
+            with phase('powerup_group.update'):
+                self.active.update(self.powerup_group, self)
+
+        with phase('info.update'):
+            self.info.update(self.current_time)
+
+    def moving_sprites(self):
+        """ 需要与障碍物做碰撞检测的动态精灵(休眠的精灵除外) """
+        yield self.player
+        for group in (self.enemy_group, self.shell_group, self.powerup_group):
+            yield from self.active.awake(group)
+
+    def save_last_positions(self):
+        """ 记录窗口、玩家以及窗口附近的精灵在上一个逻辑步的位置 """
+        self.last_window_x = self.game_window.x
+        self.last_player_pos = (self.player.rect.x, self.player.rect.y)
+        if self.interpolate:
+            area = self.game_window.inflate(2 * C.INTERPOLATE_MARGIN, 2 * C.INTERPOLATE_MARGIN)
+            self.last_positions = {sprite: sprite.rect.topleft for group in self.sprite_groups()
+                                   for sprite in collision.visible(group, area)}
 
-        self.info.update()
-        self.draw(surface)  # 将更新完的状态回显到游戏主屏幕上
+    def sprite_groups(self):
+        """ 需要绘制的精灵组(玩家除外)，按绘制顺序排列 """
+        return (self.coin_group, self.powerup_group, self.brick_group, self.box_group, self.enemy_group,
+                self.dying_group, self.shell_group)
 
     def update_game_info(self):
         """ 更新游戏信息 """
@@ -195,20 +254,21 @@ class Level:
         if self.player.rect.right > self.end_x:
             self.player.rect.right = self.end_x
         # x方向碰撞检测
-        self.check_x_collisions()
+        with self.profiler.phase('check_x_collisions'):
+            self.check_x_collisions()
         if not self.player.dead:
             self.player.rect.y += self.player.y_vel  # y方向位置更新
-            self.check_y_collisions()  # y方向碰撞检测
+            with self.profiler.phase('check_y_collisions'):
+                self.check_y_collisions()  # y方向碰撞检测
 
     def check_x_collisions(self):
         """ x方向碰撞检测 """
         # x方向障碍物碰撞检测，包括地面物品(地面、管道、台阶)、砖块、宝箱
-        check_group = pygame.sprite.Group(self.ground_items_group, self.brick_group, self.box_group)
-        collided_sprite = pygame.sprite.spritecollideany(self.player, check_group)
+        collided_sprite = self.solids.collide(self.player)
         if collided_sprite:
             self.adjust_player_x(collided_sprite)
         # x方向强化道具碰撞检测
-        powerup = pygame.sprite.spritecollideany(self.player, self.powerup_group)
+        powerup = self.powerup_group.collide(self.player)
         if powerup:
             if powerup.name == 'fireball':
                 # 马里奥发射的火球对马里奥自己并无影响
@@ -225,7 +285,7 @@ class Level:
             # 伤害免疫状态的马里奥不会在x方向和敌人与龟壳碰撞，这里提前结束碰撞检测
             return
         # x方向敌人碰撞检测
-        enemy = pygame.sprite.spritecollideany(self.player, self.enemy_group)
+        enemy = self.enemy_group.collide(self.player)
         if enemy:
             if self.player.big:
                 # 变大的马里奥撞到敌人会变小
@@ -235,7 +295,7 @@ class Level:
                 # 小马里奥撞到敌人会直接狗带
                 self.player.go_die()
         # x方向龟壳碰撞检测
-        shell = pygame.sprite.spritecollideany(self.player, self.shell_group)
+        shell = self.shell_group.collide(self.player)
         if shell:
             if shell.state == 'slide':  # x方向碰到滑动的龟壳会狗带
                 if self.player.big:
@@ -256,6 +316,7 @@ class Level:
                     shell.rect.x -= 14
                     shell.direction = 0
                 shell.state = 'slide'
+                self.shell_group.moved()
 
     def adjust_player_x(self, sprite):
         """
@@ -271,12 +332,12 @@ class Level:
     def check_y_collisions(self):
         """ y方向的碰撞检测 """
         # 地面障碍物
-        ground_item = pygame.sprite.spritecollideany(self.player, self.ground_items_group)
+        ground_item = self.solids.collide(self.player, ('ground',))
         # y方向上砖块和宝箱不再是障碍物，而是可以顶起来互动的
-        brick = pygame.sprite.spritecollideany(self.player, self.brick_group)
-        box = pygame.sprite.spritecollideany(self.player, self.box_group)
+        brick = self.solids.collide(self.player, ('brick',))
+        box = self.solids.collide(self.player, ('box',))
         # y方向可以击飞或踩扁敌人
-        enemy = pygame.sprite.spritecollideany(self.player, self.enemy_group)
+        enemy = self.enemy_group.collide(self.player)
 
         # 砖块和宝箱通常挨得近，同时碰到的时候选择最近的触发
         if box and brick:
@@ -321,8 +382,7 @@ class Level:
         :param sprite: 待检查的精灵
         """
         sprite.rect.y += 1  # 试探性地向下落一个像素
-        check_group = pygame.sprite.Group(self.ground_items_group, self.brick_group, self.box_group)
-        collided = pygame.sprite.spritecollideany(sprite, check_group)
+        collided = self.solids.collide(sprite)
         # 如果没有触发碰撞检测、精灵并非跳起状态且关卡未冻结，则精灵变成下落状态
         if not collided and sprite.state != 'jump' and not self.is_frozen():
             sprite.state = 'fall'
@@ -343,15 +403,32 @@ class Level:
             self.player.state = 'fall'
             # 被顶起
             if sprite.name == 'box':
-                sprite.go_bumped()
+                self.bump(sprite)
             elif sprite.name == 'brick':
                 if self.player.big:
-                    sprite.smashed(self.brick_group)
+                    self.smash(sprite)
                 else:
-                    sprite.go_bumped()
+                    self.bump(sprite)
             # 顶砖块的时候如果砖块上有敌人会击杀敌人
             self.is_enemy_on(sprite)
 
+    def bump(self, sprite):
+        """
+        顶起砖块或宝箱：从静态图层中取出，移动期间从障碍物索引的网格中取出
+        :param sprite: 砖块或宝箱
+        """
+        self.static_layer.lift(sprite)
+        sprite.go_bumped()
+        self.solids.track(sprite)
+
+    def smash(self, sprite):
+        """
+        顶碎砖块
+        :param sprite: 砖块
+        """
+        self.static_layer.lift(sprite)
+        sprite.smashed(self.brick_group)
+
     def is_enemy_on(self, sprite):
         """
         判断被顶的砖块是否有敌人在上面，如果有则击杀
@@ -359,7 +436,7 @@ class Level:
         """
         # 判断方式依旧是试探性地向上一个像素，并和敌人组进行碰撞检测
         sprite.rect.y -= 1
-        enemy = pygame.sprite.spritecollideany(sprite, self.enemy_group)
+        enemy = self.enemy_group.collide(sprite)
         if enemy:
             self.enemy_group.remove(enemy)
             self.dying_group.add(enemy)
@@ -391,23 +468,96 @@ class Level:
         if self.player.x_vel > 0 and self.player.rect.centerx > third and self.game_window.right < self.end_x:
             self.game_window.x += self.player.x_vel
             self.start_x = self.game_window.x
+        self.background.stream(self.game_window)  # 提前放缩窗口前方的背景分块，交还窗口后方的分块
 
-    def draw(self, surface):
-        """ 向屏幕上绘图游戏当前帧 """
+    def draw(self, surface, alpha=1):
+        """
+        向屏幕上绘图游戏当前帧
+        :param surface: 绘图设备
+        :param alpha: 插值系数，窗口和玩家(开启插值时还有窗口附近的精灵)按照该系数在上一个逻辑步和当前逻辑步的位置之间插值
+        """
+        # 插值得到本次渲染的窗口和玩家位置
+        view = self.game_window.copy()
+        view.x = self.lerp(self.last_window_x, self.game_window.x, alpha)
+        player_pos = (self.lerp(self.last_player_pos[0], self.player.rect.x, alpha),
+                      self.lerp(self.last_player_pos[1], self.player.rect.y, alpha))
+        phase = self.profiler.phase  # 各阶段的耗时统计
+        # 直接在屏幕上绘制窗口内的场景，地图坐标减去窗口位置即为屏幕坐标
+        offset = (-view.x, -view.y)
+        self.drawn = self.culled = 0
+        self.blits = 1  # 玩家
         # 绘制背景和玩家
-        self.game_ground.blit(self.background, self.game_window, self.game_window)
-        self.game_ground.blit(self.player.image, self.player.rect)
+        with phase('draw.background'):
+            self.background.draw(surface, view)
+        with phase('draw.player'):
+            surface.blit(self.player.image, (player_pos[0] + offset[0], player_pos[1] + offset[1]))
         # 绘制硬币和强化道具
-        self.coin_group.draw(self.game_ground)
-        self.powerup_group.draw(self.game_ground)
-        # 绘制砖块和宝箱(覆盖在硬币和强化道具上面)
-        self.brick_group.draw(self.game_ground)
-        self.box_group.draw(self.game_ground)
+        with phase('draw.coin_group'):
+            self.draw_group(surface, self.coin_group, view, offset, alpha)
+        with phase('draw.powerup_group'):
+            self.draw_group(surface, self.powerup_group, view, offset, alpha)
+        # 绘制砖块和宝箱(覆盖在硬币和强化道具上面)：先画静态图层，再逐个画不在图层上的砖块和宝箱
+        with phase('draw.static_layer'):
+            self.blits += self.static_layer.draw(surface, view, offset)
+        covered = []  # 逐个画出的砖块和宝箱的位置
+        with phase('draw.brick_group'):
+            self.draw_group(surface, self.brick_group, view, offset, alpha, self.static_layer.baked, covered)
+        with phase('draw.box_group'):
+            self.draw_group(surface, self.box_group, view, offset, alpha, self.static_layer.baked, covered)
         # 绘制各种状态的敌人
-        self.enemy_group.draw(self.game_ground)
-        self.dying_group.draw(self.game_ground)
-        self.shell_group.draw(self.game_ground)
-        # 将游戏场景整体贴在屏幕上
-        surface.blit(self.game_ground, (0, 0), self.game_window)
+        with phase('draw.enemy_group'):
+            self.draw_group(surface, self.enemy_group, view, offset, alpha)
+        with phase('draw.dying_group'):
+            self.draw_group(surface, self.dying_group, view, offset, alpha)
+        with phase('draw.shell_group'):
+            self.draw_group(surface, self.shell_group, view, offset, alpha)
         # 绘制游戏信息
-        self.info.draw(surface)
+        with phase('draw.info'):
+            self.info.draw(surface)
+
+    def draw_group(self, surface, group, view, offset, alpha=1, baked=None, covered=None):
+        """
+        按窗口偏移绘制精灵组中在窗口内的精灵，窗口外的精灵直接跳过，绘制顺序与pygame.sprite.Group.draw()相同
+        :param surface: 绘图设备
+        :param group: 精灵组
+        :param view: 窗口矩形(地图坐标)
+        :param offset: 地图坐标到屏幕坐标的偏移
+        :param alpha: 插值系数，记录了上一个逻辑步位置的精灵在两个位置之间插值，其余精灵画在当前位置
+        :param baked: 已经画在静态图层上的精灵，跳过不画，除非它与之前逐个画出的精灵重叠(要盖在那个精灵上面)
+        :param covered: 逐个画出的精灵的位置(地图坐标)，同一个静态图层的各个组共用，画出的精灵会追加进去
+        """
+        last_positions = self.last_positions if alpha != 1 else None
+        if last_positions:
+            # 插值后的位置与当前位置相差不超过一个逻辑步的移动距离，剔除时把窗口放宽一些
+            view = view.inflate(2 * C.INTERPOLATE_MARGIN, 2 * C.INTERPOLATE_MARGIN)
+        sprites = collision.visible(group, view)
+        self.drawn += len(sprites)
+        self.culled += len(group) - len(sprites)
+        if baked is None and not last_positions:
+            self.blits += len(sprites)
+            surface.blits([(sprite.image, sprite.rect.move(offset)) for sprite in sprites], False)
+            return
+        blits = []
+        for sprite in sprites:
+            rect = sprite.rect
+            if last_positions:
+                x, y = last_positions.get(sprite, rect.topleft)
+                rect = rect.move(self.lerp(x, rect.x, alpha) - rect.x, self.lerp(y, rect.y, alpha) - rect.y)
+            if baked is not None:
+                if sprite in baked and rect.collidelist(covered) == -1:
+                    continue
+                covered.append(rect)
+            blits.append((sprite.image, rect.move(offset)))
+        self.blits += len(blits)
+        surface.blits(blits, False)
+
+    @staticmethod
+    def lerp(start, end, alpha):
+        """
+        线性插值
+        :param start: 起始值
+        :param end: 结束值
+        :param alpha: 插值系数
+        :return: 取整后的插值结果
+        """
+        return round(start + (end - start) * alpha)
@@ -4,11 +4,17 @@ __author__ = 201220014@smail.nju.edu.cn
 """
 
 from ..components import info
-import pygame
 
 
 class LoadScreen:
 
+    def __init__(self, clock):
+        """
+        加载界面构造函数
+        :param clock: 游戏时钟
+        """
+        self.clock = clock
+
     def start(self, game_info):
         """
         启动方法，为了方便多次调用同一对象，没有写在构造函数中
@@ -27,19 +33,20 @@ class LoadScreen:
         :param surface: 更新的表面(游戏窗口/屏幕/画布)
         :param keys: 键盘信号
         """
-        self.info.update()  # 更新游戏信息
-        self.draw(surface)  # 绘制加载界面
+        current_time = self.clock.get_ticks()
+        self.info.update(current_time)  # 更新游戏信息
         # 计时
         if self.timer == 0:
-            self.timer = pygame.time.get_ticks()
-        elif pygame.time.get_ticks() - self.timer > self.duration:
+            self.timer = current_time
+        elif current_time - self.timer > self.duration:
             self.finished = True
             self.timer = 0
 
-    def draw(self, surface):
+    def draw(self, surface, alpha=1):
         """
         绘图函数
         :param surface: 绘图设备
+        :param alpha: 插值系数(加载界面画面静止，无需插值)
         """
         surface.fill((0, 0, 0))  # 填充底色为黑
         self.info.draw(surface)
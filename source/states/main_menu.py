@@ -6,15 +6,20 @@ __author__ = 201220014@smail.nju.edu.cn
 import pygame
 
 from .. import constants as C
-from .. import setup, tools
+from .. import setup, tools, background
 from ..components import info
 
 
 class MainMenu:
     """ 主菜单类 """
 
-    def __init__(self):
-        """ 主菜单类构造函数 """
+    def __init__(self, clock):
+        """
+        主菜单类构造函数
+        :param clock: 游戏时钟
+        """
+        self.clock = clock
+        self.background = None  # 分块背景，与第一关共用资源管理器中的背景分块
         game_info = {
             'score': 0,
             'coin': 0,
@@ -35,12 +40,12 @@ class MainMenu:
 
     def setup_background(self):
         """ 设置背景 """
-        self.background = setup.GRAPHICS['level_1']  # 获取背景图片
+        # 主菜单只显示第一关背景的开头部分，只会放缩用到的几个分块
+        if self.background is None:
+            self.background = background.TiledBackground('level_1')
         self.background_rect = self.background.get_rect()  # 获取背景图矩形范围
-        # 背景图放缩以适应窗口
-        self.background = pygame.transform.scale(self.background, (int(self.background_rect.width * C.BG_MULTI),
-                                                                   int(self.background_rect.height * C.BG_MULTI)))
         self.viewport = setup.SCREEN.get_rect()  # 获取窗口矩形范围
+        self.background.stream(self.viewport, ahead=0, behind=0)  # 第一帧之前放缩好窗口内的分块
         # 获取并设置标题图片： 截图 + 抠图 + 放缩
         self.caption = tools.get_image(setup.GRAPHICS['title_screen'], 1, 60, 176, 88, C.BG_MULTI)
 
@@ -71,14 +76,19 @@ class MainMenu:
         :param keys: 捕捉到的键盘信号
         """
         self.update_cursor(keys)  # 更新光标状态
-        # 绘制主菜单
-        surface.blit(self.background, self.viewport)  # 绘制背景
+        self.info.update(self.clock.get_ticks())  # 更新信息
+
+    def draw(self, surface, alpha=1):
+        """
+        主菜单的绘图函数
+        :param surface: 绘图设备 - 游戏屏幕
+        :param alpha: 插值系数(主菜单画面静止，无需插值)
+        """
+        self.background.draw(surface, self.viewport)  # 绘制背景
         surface.blit(self.caption, (170, 100))  # 绘制标题
         surface.blit(self.player_image, (110, 490))  # 绘制玩家图片
         surface.blit(self.cursor.image, self.cursor.rect)  # 绘制光标
-        # 更新并绘制信息
-        self.info.update()
-        self.info.draw(surface)
+        self.info.draw(surface)  # 绘制信息
 
     def update_cursor(self, keys):
         """
@@ -100,6 +110,10 @@ class MainMenu:
                 self.finished = True
             # TODO: 对单人模式和双人模式分别处理，我暂时未区分，1P和2P都是单人模式
 
+    def stop(self):
+        """ 离开主菜单时交还持有的背景分块，分块留在资源管理器的缓存中，第一关开始时直接取回 """
+        self.background.close()
+
     def reset_game_info(self):
         """
         重置游戏信息，在玩家死亡后会被调用
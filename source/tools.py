@@ -5,74 +5,413 @@ __author__ = 201220014@smail.nju.edu.cn
 
 import pygame
 import os  # 操作系统标准库
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from . import constants as C
+from . import profiling
 
 
 class Game:
     """ 游戏主控类，控制主要游戏流程 """
 
-    def __init__(self, state_dict, start_state):
+    def __init__(self, state_dict, start_state, game_clock=None, fixed_timestep=False, turbo=False, render=True,
+                 max_frames=None, recorder=None, replay=None, profiler=None):
         """
         游戏主控类构造函数
         :param state_dict: 储存游戏状态的字典
         :param start_state: 开始状态
+        :param game_clock: 游戏时钟，应与各个游戏状态共用同一个，为None时新建一个
+        :param fixed_timestep: 是否启用固定步长模式(逻辑以固定帧率更新，渲染以不超过C.RENDER_FPS的帧率进行并插值)
+        :param turbo: 是否启用加速模式(不限制帧率，逻辑以机器能承受的最快速度推进)
+        :param render: 是否绘制游戏画面，关闭后只推进游戏逻辑
+        :param max_frames: 最多推进的逻辑步数，达到后run()返回，None表示不限制
+        :param recorder: 按键录制器(见replay.Recorder)，每个逻辑步的按键状态都会被记录下来
+        :param replay: 按键回放器(见replay.Replay)，设置后以录像中的按键代替键盘输入，回放完毕后run()返回
+        :param profiler: 帧耗时分析器(见profiling.Profiler)，设置后统计每帧逻辑和绘制的耗时，按F3显示耗时面板
         """
         self.screen = pygame.display.get_surface()  # 获取游戏画面
         self.clock = pygame.time.Clock()  # 时钟：计时 + 控制帧数
+        self.game_clock = game_clock or GameClock()  # 游戏时钟：每个逻辑步推进一次，游戏逻辑中的计时全部以它为准
         self.keys = pygame.key.get_pressed()  # 捕捉键盘事件
         self.state_dict = state_dict  # 初始化状态字典
         self.state = self.state_dict[start_state]  # 初始化游戏状态
+        self.fixed_timestep = fixed_timestep
+        self.step_time = 1000 / C.FPS  # 每个逻辑步对应的时长(毫秒)
+        self.accumulator = 0  # 时间累加器：尚未被逻辑步消化的时间
+        self.turbo = turbo
+        self.render = render
+        self.max_frames = max_frames
+        self.frame_count = 0  # 已经推进的逻辑步数
+        self.recorder = recorder
+        self.replay = replay
+        self.quit = False  # 是否收到了退出事件
+        self.profiler = profiler or profiling.Profiler(enabled=False)
+
+    @property
+    def done(self):
+        """ 游戏是否结束：收到退出事件、推进了足够多的逻辑步或者录像回放完毕 """
+        if self.quit:
+            return True
+        if self.max_frames is not None and self.frame_count >= self.max_frames:
+            return True
+        return self.replay is not None and self.replay.finished
 
     def update(self):
-        """ 主控类的更新函数，让游戏状态跟新屏幕内容。如果当前状态结束，则转入下一个状态。 """
+        """ 主控类的更新函数，让游戏状态推进一个逻辑步。如果当前状态结束，则转入下一个状态。 """
         if self.state.finished:
             game_info = self.state.game_info  # 记录当前状态的游戏信息
             next_state = self.state.next  # 记录下一个状态
             self.state.finished = False  # 重置状态结束标记
+            if hasattr(self.state, 'stop'):
+                self.state.stop()  # 离开状态时让它交还持有的资源
             self.state = self.state_dict[next_state]  # 将当前状态更新为下一个状态
             self.state.start(game_info)  # 将上一个状态记录的游戏信息传入下一个状态并开启状态
-        self.state.update(self.screen, self.keys)  # 让现行状态依据键盘事件更新屏幕内容
+        self.game_clock.tick()  # 推进游戏时间
+        if self.replay:
+            self.keys = self.replay.next_keys()  # 回放模式下按键来自录像
+        if self.recorder:
+            self.recorder.record(self.keys)
+        with self.profiler.phase('game.update'):
+            self.state.update(self.screen, self.keys)  # 让现行状态依据键盘事件更新
+        self.frame_count += 1
+
+    def draw(self, alpha=1):
+        """
+        绘制当前状态并刷新显示屏
+        :param alpha: 插值系数，表示当前时刻处于上一个逻辑步和当前逻辑步之间的位置(0~1)
+        """
+        if not self.render:
+            return
+        with self.profiler.phase('game.draw'):
+            self.state.draw(self.screen, alpha)
+        self.profiler.draw(self.screen)  # 耗时面板
+        pygame.display.update()  # 跟新显示屏内容
+
+    def handle_events(self):
+        """ 捕捉游戏事件并处理或者记录信息留待处理 """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit = True  # 结束游戏循环，由调用者负责退出程序
+            elif event.type == pygame.KEYDOWN:
+                self.keys = pygame.key.get_pressed()  # 捕捉按键信息
+                if event.key == profiling.TOGGLE_KEY:
+                    self.profiler.toggle_overlay()
+            elif event.type == pygame.KEYUP:
+                self.keys = pygame.key.get_pressed()  # 捕捉案件信息
 
     def run(self):
         """ 游戏核心驱动程序 """
-        while True:
-            # 捕捉游戏事件并处理或者记录信息留待处理
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.display.quit()  # 退出显示屏
-                    quit()  # 退出程序
-                elif event.type == pygame.KEYDOWN:
-                    self.keys = pygame.key.get_pressed()  # 捕捉按键信息
-                elif event.type == pygame.KEYUP:
-                    self.keys = pygame.key.get_pressed()  # 捕捉案件信息
-
+        if self.turbo:
+            self.run_turbo()
+            return
+        if self.fixed_timestep:
+            self.run_fixed_timestep()
+            return
+        while not self.done:
+            self.handle_events()
             self.update()  # 更新游戏状态
+            self.draw()  # 绘制游戏画面
+            self.clock.tick(C.FPS)  # 帧数：游戏画面每秒钟变化的次数，帧数越大，游戏越快
+
+    def run_fixed_timestep(self):
+        """
+        固定步长的游戏驱动程序：逻辑固定以C.FPS的频率推进，与渲染解耦。
+        渲染慢的时候一次追赶多个逻辑步(相当于丢掉中间的渲染帧)，渲染快的时候在两个逻辑步之间插值绘制，
+        渲染帧率不超过C.RENDER_FPS，两帧之间的空闲时间让出CPU。
+        """
+        self.clock.tick()
+        self.accumulator = 0
+        while not self.done:
+            self.handle_events()
+            self.accumulator += self.clock.tick(C.RENDER_FPS)  # 累加上一帧实际经过的时间
+            steps = 0
+            while self.accumulator >= self.step_time and not self.done:
+                self.update()
+                self.accumulator -= self.step_time
+                steps += 1
+                if steps == C.MAX_FRAME_STEPS:
+                    # 落后太多的时候放弃追赶，避免越追越慢的死循环，游戏只会短暂地变慢
+                    self.accumulator %= self.step_time
+                    break
+            self.draw(self.accumulator / self.step_time)
+
+    def run_turbo(self):
+        """ 加速模式的游戏驱动程序：不限制帧率，每次循环推进一个逻辑步，适合批量跑关卡 """
+        while not self.done:
+            self.handle_events()
+            self.update()
+            self.draw()
+
+
+class GameClock:
+    """
+    游戏时钟，记录按逻辑步推进的游戏时间。
+    游戏逻辑中的计时器都读取这个时钟而不是pygame.time.get_ticks()，所以游戏的行为只和推进了多少逻辑步有关，
+    与真实经过的时间无关，无论以多快的速度运行结果都完全相同。
+    """
+
+    def __init__(self, fps=C.FPS):
+        """
+        游戏时钟构造函数
+        :param fps: 每秒钟对应的逻辑步数
+        """
+        self.fps = fps
+        self.frame = 0  # 已经推进的逻辑步数
+
+    def tick(self):
+        """ 推进一个逻辑步 """
+        self.frame += 1
+
+    def get_ticks(self):
+        """
+        获取当前游戏时间，用法同pygame.time.get_ticks()
+        :return: 游戏开始以来经过的游戏时间(毫秒)
+        """
+        return self.frame * 1000 // self.fps
+
+    def reset(self):
+        """ 重置游戏时间 """
+        self.frame = 0
+
+
+def load_image(file_path):
+    """
+    加载单张图片并转换成与屏幕一致的像素格式
+    :param file_path: 图片路径
+    :return: pygame图片对象
+    """
+    return convert_image(pygame.image.load(file_path))
+
+
+def convert_image(img):
+    """
+    将解码好的图片转换成与屏幕一致的像素格式，需要在主线程中调用
+    :param img: pygame图片对象
+    :return: 转换后的图片
+    """
+    if img.get_alpha():  # 带有alpha层，即透明底的图片
+        return img.convert_alpha()
+    # 上述转换操作可以加快游戏画面渲染，不过不是必须的
+    return img.convert()
+
 
-            pygame.display.update()  # 跟新显示屏内容
-            self.clock.tick(60)  # 帧数：游戏画面每秒钟变化的次数，帧数越大，游戏越快
+def decode_image(file_path):
+    """
+    解码单张图片(不转换像素格式，可以在工作线程中调用)
+    :param file_path: 图片路径
+    :return: (pygame图片对象, 解码耗时(毫秒))
+    """
+    start = perf_counter()
+    img = pygame.image.load(file_path)
+    return img, (perf_counter() - start) * 1000
+
+
+def load_images(paths, workers=None, timings=None):
+    """
+    批量加载图片：在线程池中并行解码(解码时不持有GIL)，再在主线程中依次转换像素格式
+    :param paths: 图片名 -> 图片路径
+    :param workers: 解码线程数，None表示由线程池决定，1表示在当前线程中依次解码
+    :param timings: 传入字典时记录每个文件的耗时，图片名 -> {'decode': 毫秒, 'convert': 毫秒}
+    :return: 图片名 -> pygame图片对象
+    """
+    names = list(paths)
+    if workers == 1:
+        decoded = [decode_image(paths[name]) for name in names]
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            decoded = list(pool.map(decode_image, [paths[name] for name in names]))
+    images = {}
+    for name, (img, decode_time) in zip(names, decoded):
+        start = perf_counter()
+        images[name] = convert_image(img)
+        if timings is not None:
+            timings[name] = {'decode': decode_time, 'convert': (perf_counter() - start) * 1000}
+    return images
 
 
-def load_graphics(path, accept=('.jpg', '.png', '.bmp', '.gif')):
-    """ 加载素材文件夹中的所有图片到一个字典中
+def list_images(path, accept=('.jpg', '.png', '.bmp', '.gif')):
+    """
+    罗列素材文件夹中的图片文件
+    :param path: 文件夹路径
+    :param accept: 接受的图片文件扩展名
+    :return: 图片名 -> 文件名
+    """
+    files = {}
+    for pic in sorted(os.listdir(path)):  # listdir(path): 罗列路径下的所有条目(目录+文件)
+        name, ext = os.path.splitext(pic)  # 分拆文件名和后缀
+        if ext.lower() in accept:
+            files[name] = pic
+    return files
+
+
+def load_graphics(path, accept=('.jpg', '.png', '.bmp', '.gif'), workers=None, timings=None):
+    """ 加载素材文件夹中的所有图片到一个字典中，图片在线程池中并行解码(见load_images())
         :param path: 文件夹路径
         :param accept: 接受的图片文件扩展名
+        :param workers: 解码线程数，1表示依次解码
+        :param timings: 传入字典时记录每个文件的解码和转换耗时
         :return: pygame图片字典
     """
-    graphics = {}
-    for pic in os.listdir(path):  # listdir(path): 罗列路径下的所有条目(目录+文件)
-        name, ext = os.path.splitext(pic)  # 分拆文件名和后缀
-        if ext.lower() in accept:
-            img = pygame.image.load(os.path.join(path, pic))
-            if img.get_alpha():  # 带有alpha层，即透明底的图片
-                img = img.convert_alpha()
-            else:
-                img = img.convert()
-            # 上述转换操作可以加快游戏画面渲染，不过不是必须的
-            graphics[name] = img
-    return graphics
-
-
-def get_image(sheet, x, y, width, height, scale, colorkey=None):
-    """ 从已经加载的图片里获取某部分图片
+    files = list_images(path, accept)
+    return load_images({name: os.path.join(path, pic) for name, pic in files.items()}, workers, timings)
+
+
+class LazyGraphics(Mapping):
+    """
+    按需加载的图片字典，用法与load_graphics()返回的字典相同。
+    创建时只罗列素材文件夹中的图片文件，每张图片第一次被取用的时候才解码并转换格式，
+    关卡背景这类同一时间只用到一张的大图就不会全部常驻内存了。
+    """
+
+    def __init__(self, path, accept=('.jpg', '.png', '.bmp', '.gif')):
+        """
+        按需加载的图片字典构造函数
+        :param path: 文件夹路径
+        :param accept: 接受的图片文件扩展名
+        """
+        self.path = path
+        self.files = list_images(path, accept)  # 图片名 -> 文件名
+        self.images = {}  # 已经加载的图片
+        self.names = {}  # 已经加载的图片的id -> 图片名
+
+    def __getitem__(self, name):
+        image = self.images.get(name)
+        if image is None:
+            image = load_image(os.path.join(self.path, self.files[name]))
+            self.add(name, image)
+        return image
+
+    def add(self, name, image):
+        """
+        记录加载好的图片
+        :param name: 图片名
+        :param image: pygame图片对象
+        """
+        self.images[name] = image
+        self.names[id(image)] = name
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def is_loaded(self, name):
+        """
+        图片是否已经加载
+        :param name: 图片名
+        """
+        return name in self.images
+
+    def name_of(self, image):
+        """
+        查找已经加载的图片的图片名
+        :param image: pygame图片对象
+        :return: 图片名，不是由本字典加载的图片返回None
+        """
+        return self.names.get(id(image))
+
+    def prefetch(self, names=None, workers=None, timings=None):
+        """
+        提前加载图片，比如在加载界面中提前加载下一关要用到的图片，尚未加载的图片在线程池中并行解码(见load_images())
+        :param names: 需要加载的图片名，None表示全部加载
+        :param workers: 解码线程数，1表示依次解码
+        :param timings: 传入字典时记录每个文件的解码和转换耗时
+        :return: 图片字典本身
+        """
+        paths = {name: os.path.join(self.path, self.files[name])
+                 for name in (self.files if names is None else names) if name not in self.images}
+        for name, image in load_images(paths, workers, timings).items():
+            self.add(name, image)
+        return self
+
+    def unload(self, name):
+        """
+        释放已经加载的图片，下次取用时重新加载
+        :param name: 图片名
+        """
+        image = self.images.pop(name, None)
+        if image is not None:
+            del self.names[id(image)]
+
+
+class FrameCache:
+    """
+    进程内共享的帧图片缓存，键为(原图, 截取区域, 放大倍数, 抠图底色, 是否水平翻转)。
+    缓存中的图片被所有调用者共用，取出后只能读取或者贴到别的画布上，不能在上面绘图。
+    关联了烘焙缓存(见bake.py)之后，未命中的帧图片优先从烘焙缓存中读取，不再重新截取和放大。
+    """
+
+    def __init__(self):
+        """ 帧图片缓存构造函数 """
+        self.frames = {}
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.graphics = None  # 原图所在的按需加载图片字典，用来查找原图的图片名
+        self.baked = None  # 烘焙缓存
+
+    def attach(self, graphics, baked):
+        """
+        关联烘焙缓存
+        :param graphics: 按需加载的图片字典
+        :param baked: 烘焙缓存，为None时所有帧图片都重新截取
+        """
+        self.graphics = graphics
+        self.baked = baked
+
+    def load_baked(self, key):
+        """
+        从烘焙缓存中读取帧图片
+        :param key: 缓存键
+        :return: pygame图片对象，烘焙缓存中没有时返回None
+        """
+        if self.baked is None:
+            return None
+        name = self.graphics.name_of(key[0])
+        if name is None:
+            return None
+        return self.baked.frame((name,) + key[1:])
+
+    def get(self, key, create):
+        """
+        获取缓存的帧图片，没有则创建并放入缓存
+        :param key: 缓存键
+        :param create: 创建帧图片的函数
+        :return: pygame图片对象
+        """
+        image = self.frames.get(key)
+        if image is None:
+            self.misses += 1
+            image = self.load_baked(key)
+            if image is None:
+                image = create()
+            self.frames[key] = image
+        else:
+            self.hits += 1
+        return image
+
+    def stats(self):
+        """
+        缓存的使用情况
+        :return: 缓存的图片数、命中次数、未命中次数和命中率组成的字典
+        """
+        total = self.hits + self.misses
+        return {'size': len(self.frames), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0}
+
+    def clear(self):
+        """ 清空缓存和统计 """
+        self.frames.clear()
+        self.hits = self.misses = 0
+
+
+FRAME_CACHE = FrameCache()
+
+
+def get_image(sheet, x, y, width, height, scale, colorkey=None, flip=False):
+    """ 从已经加载的图片里获取某部分图片，相同的截取参数返回缓存中的同一张图片(见FrameCache)
         :param sheet: 待抠图片
         :param x: 目标区域左上角横坐标
         :param y: 目标区域左上角纵坐标
@@ -80,6 +419,18 @@ def get_image(sheet, x, y, width, height, scale, colorkey=None):
         :param height: 目标区域高
         :param scale: 放大倍数
         :param colorkey: 抠图底色
+        :param flip: 是否水平翻转
+        :return: pygame图片对象
+    """
+    if colorkey:
+        colorkey = tuple(colorkey)  # pygame.Color和列表都不能作为字典的键
+    return FRAME_CACHE.get((sheet, x, y, width, height, scale, colorkey, flip),
+                           lambda: make_image(sheet, x, y, width, height, scale, colorkey, flip))
+
+
+def make_image(sheet, x, y, width, height, scale, colorkey=None, flip=False):
+    """ 从已经加载的图片里截取某部分图片并放大，每次调用都创建新的图片
+        参数与get_image()相同
         :return: pygame图片对象
     """
     image = pygame.Surface((width, height))  # 创建空的pygame画布
@@ -88,4 +439,6 @@ def get_image(sheet, x, y, width, height, scale, colorkey=None):
         colorkey = image.get_at((0, 0))  # 获取图片底色
     image.set_colorkey(colorkey)  # 对底色抠图
     image = pygame.transform.scale(image, (int(width * scale), int(height * scale)))  # 放大图片
+    if flip:
+        image = pygame.transform.flip(image, True, False)  # 水平翻转，得到朝向相反的帧图片
     return image
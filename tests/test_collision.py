@@ -0,0 +1,262 @@
+"""
+碰撞检测宽相位测试：障碍物索引的查询结果与对各精灵组依次调用pygame.sprite.spritecollideany()一致
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import os
+import random
+import unittest
+
+os.environ.setdefault('SUPERMARIO_HEADLESS', '1')
+
+import pygame
+
+from source import tools, replay, collision
+from source.states import level
+
+GAME_INFO = {'score': 0, 'coin': 0, 'lives': 3, 'player_state': 'small'}
+
+
+def new_level(level_num=1):
+    """
+    创建并开启一个关卡
+    :param level_num: 关卡序号
+    :return: 关卡对象和它的游戏时钟
+    """
+    clock = tools.GameClock()
+    lv = level.Level(clock)
+    lv.start(dict(GAME_INFO, level_num=level_num))
+    return lv, clock
+
+
+def box(x, y, w, h):
+    """
+    只有矩形的精灵
+    :param x: 左端
+    :param y: 顶端
+    :param w: 宽
+    :param h: 高
+    :return: 精灵
+    """
+    sprite = pygame.sprite.Sprite()
+    sprite.rect = pygame.Rect(x, y, w, h)
+    return sprite
+
+
+def probes(lv, rng, count):
+    """
+    地图各处的随机矩形，其中一部分贴着障碍物的边缘
+    :param lv: 关卡对象
+    :param rng: 随机数生成器
+    :param count: 数量
+    :return: 精灵列表
+    """
+    solids = list(lv.ground_items_group) + list(lv.brick_group) + list(lv.box_group)
+    sprites = []
+    for i in range(count):
+        if i % 2:
+            rect = rng.choice(solids).rect
+            x = rng.choice([rect.left - 40, rect.right, rect.left + rng.randint(-20, 20)])
+            y = rng.choice([rect.top - 60, rect.bottom, rect.top + rng.randint(-30, 30)])
+        else:
+            x, y = rng.randint(-100, lv.end_x), rng.randint(-100, 700)
+        sprites.append(box(x, y, rng.randint(1, 90), rng.randint(1, 90)))
+    return sprites
+
+
+def scan(lv, sprite, layers=collision.LAYERS):
+    """
+    对各层的精灵组依次逐个检测
+    :param lv: 关卡对象
+    :param sprite: 精灵
+    :param layers: 参与检测的层及其先后顺序
+    :return: 先检测到的障碍物
+    """
+    groups = {'ground': lv.ground_items_group, 'brick': lv.brick_group, 'box': lv.box_group}
+    for layer in layers:
+        found = pygame.sprite.spritecollideany(sprite, groups[layer])
+        if found:
+            return found
+    return None
+
+
+class SolidIndexTest(unittest.TestCase):
+    """ 障碍物索引与逐个检测的一致性 """
+
+    LAYER_ORDERS = [collision.LAYERS, ('ground',), ('brick',), ('box',), ('ground', 'box', 'brick')]
+
+    def assert_matches(self, lv, sprites):
+        """
+        比较每个精灵在各种层顺序下的查询结果
+        :param lv: 关卡对象
+        :param sprites: 精灵列表
+        """
+        for sprite in sprites:
+            for layers in self.LAYER_ORDERS:
+                self.assertIs(lv.solids.collide(sprite, layers), scan(lv, sprite, layers), (sprite.rect, layers))
+
+    def bump_some(self, lv, rng):
+        """ 顶起或者顶碎一些砖块和宝箱 """
+        for sprite in list(lv.brick_group) + list(lv.box_group):
+            if sprite.name in ('brick', 'box') and sprite.state in ('rest', 'open') and rng.random() < 0.2:
+                if sprite.name == 'brick' and rng.random() < 0.3:
+                    lv.smash(sprite)
+                else:
+                    lv.bump(sprite)
+
+    def check_level(self, level_num, batch_size):
+        """
+        关卡运行期间反复顶起砖块和宝箱，比较查询结果
+        :param level_num: 关卡序号
+        :param batch_size: 做批量碰撞检测所需的最少动态精灵数
+        """
+        rng = random.Random(level_num)
+        lv, clock = new_level(level_num)
+        lv.solids.batch_size = batch_size
+        for frame in range(40):
+            if frame % 10 == 0:
+                self.bump_some(lv, rng)
+            clock.tick()
+            lv.update(None, replay.KEY_STATES[0])
+            sprites = probes(lv, rng, 30)
+            lv.solids.prepare(sprites)
+            self.assertEqual(bool(lv.solids.contacts), batch_size == 1)
+            self.assert_matches(lv, sprites)
+            for sprite in sprites:  # 在扩展后的矩形之内和之外移动，分别走批量检测的结果和直接查询
+                sprite.rect.move_ip(rng.randint(-30, 30), rng.randint(-30, 30))
+            self.assert_matches(lv, sprites)
+
+    def test_batched(self):
+        for level_num in (1, 2, 3, 4):
+            self.check_level(level_num, 1)
+
+    def test_per_sprite(self):
+        for level_num in (1, 2, 3, 4):
+            self.check_level(level_num, float('inf'))
+
+    def test_bumped_brick_leaves_grid(self):
+        lv, clock = new_level(1)
+        brick = next(sprite for sprite in lv.brick_group if sprite.name == 'brick')
+        solids = lv.solids
+        cells = solids.cells_of(brick.rect)
+        lv.bump(brick)
+        self.assertIn(brick, solids.moving)
+        self.assertIsNone(solids.entries[brick][2])
+        self.assertFalse(any(brick in solids.cells.get(cell, ()) for cell in cells))
+        for _ in range(100):
+            clock.tick()
+            lv.update(None, replay.KEY_STATES[0])
+            if brick.state != 'bumped':
+                break
+        self.assertEqual(brick.state, 'rest')
+        self.assertEqual(brick.rect.topleft, (brick.x, brick.y))
+        self.assertNotIn(brick, solids.moving)
+        self.assertEqual(solids.entries[brick][2], cells)
+        self.assertTrue(all(brick in solids.cells[cell] for cell in cells))
+        probe = box(brick.rect.x + 1, brick.rect.y + 1, 5, 5)
+        self.assertIs(solids.collide(probe, ('brick',)), brick)
+
+
+class IntervalIndexTest(unittest.TestCase):
+    """ 地面物品区间树的查询 """
+
+    def test_surface_below(self):
+        ground, low, high, pipe = box(0, 500, 1000, 60), box(100, 400, 100, 100), box(150, 300, 30, 100), \
+            box(120, 450, 140, 50)
+        tree = collision.IntervalIndex([ground, low, high, pipe])
+        self.assertIs(tree.surface_below(160, 0), high)  # 重叠的表面中取最高的
+        self.assertIs(tree.surface_below(160, 301), low)
+        self.assertIs(tree.surface_below(160, 400), low)  # 包括y处的表面
+        self.assertIs(tree.surface_below(160, 401), pipe)
+        self.assertIs(tree.surface_below(200, 0), pipe)  # 不包括右端
+        self.assertIs(tree.surface_below(100, 0), low)  # 包括左端
+        self.assertIs(tree.surface_below(999, 0), ground)
+        self.assertIsNone(tree.surface_below(160, 501))  # 下面什么都没有
+        self.assertIsNone(tree.surface_below(1000, 0))
+        self.assertIsNone(tree.surface_below(-1, 0))
+        self.assertIsNone(collision.IntervalIndex([]).surface_below(0, 0))
+
+    def test_surface_below_level(self):
+        rng = random.Random(0)
+        for level_num in (1, 2, 3, 4):
+            lv, clock = new_level(level_num)
+            items = list(lv.ground_items_group)
+            for _ in range(500):
+                x, y = rng.randint(-50, lv.end_x + 50), rng.randint(-50, 650)
+                below = [item.rect.top for item in items if item.rect.left <= x < item.rect.right and
+                         item.rect.top >= y]
+                found = lv.solids.surface_below(x, y)
+                self.assertEqual(found and found.rect.top, min(below, default=None), (level_num, x, y))
+
+    def test_overlapping(self):
+        rng = random.Random(0)
+        for level_num in (1, 2, 3, 4):
+            lv, clock = new_level(level_num)
+            tree = lv.solids.ground_tree()
+            for sprite in probes(lv, rng, 300):
+                expected = {item for item in lv.ground_items_group if sprite.rect.colliderect(item.rect)}
+                self.assertEqual(set(tree.overlapping(sprite.rect)), expected, (level_num, sprite.rect))
+
+
+class SweepGroupTest(unittest.TestCase):
+    """ 扫描排除法与逐个检测的一致性 """
+
+    @staticmethod
+    def grid_sprites(rng, count):
+        """
+        坐标和尺寸都是5的倍数的随机精灵，很多精灵的边缘正好挨在一起
+        :param rng: 随机数生成器
+        :param count: 数量
+        :return: 精灵列表
+        """
+        return [box(rng.randrange(0, 300, 5), rng.randrange(0, 100, 5), rng.randrange(0, 40, 5),
+                    rng.randrange(5, 40, 5)) for _ in range(count)]
+
+    def assert_matches(self, group, queries, rng):
+        """
+        比较每个查询精灵的碰撞结果、窗口查询结果和x范围查询结果
+        :param group: 动态精灵组
+        :param queries: 查询精灵组
+        :param rng: 随机数生成器
+        """
+        pairs = pygame.sprite.groupcollide(queries, group, False, False)
+        for sprite in queries:
+            self.assertEqual(group.visible(sprite.rect), pairs.get(sprite, []), sprite.rect)
+            self.assertIs(group.collide(sprite), pygame.sprite.spritecollideany(sprite, group), sprite.rect)
+            # x范围包括两端：右端正好等于left或者左端正好等于right的精灵也算
+            left = sprite.rect.left
+            for right in (left, sprite.rect.right, left + rng.randrange(0, 60, 5)):
+                expected = [other for other in group if other.rect.right >= left and other.rect.left <= right]
+                self.assertEqual(group.span(left, right), expected, (left, right))
+
+    def test_pairs(self):
+        rng = random.Random(0)
+        group = collision.SweepGroup(*self.grid_sprites(rng, 80))
+        queries = pygame.sprite.Group(*self.grid_sprites(rng, 80))
+        self.assert_matches(group, queries, rng)
+        for _ in range(20):  # 移动、移除和加入精灵之后再比较
+            for sprite in group:
+                sprite.rect.move_ip(rng.choice([-5, 0, 5]), rng.choice([-5, 0, 5]))
+            group.moved()
+            group.remove(*rng.sample(group.sprites(), 5))
+            group.add(*self.grid_sprites(rng, 5))
+            self.assert_matches(group, queries, rng)
+
+    def test_touching_edges(self):
+        left, right, wide = box(0, 0, 10, 10), box(10, 0, 10, 10), box(-100, 0, 300, 10)
+        group = collision.SweepGroup(left, right)
+        self.assertIsNone(group.collide(box(20, 0, 5, 10)))  # 左边挨着
+        self.assertIsNone(group.collide(box(-5, 0, 5, 10)))  # 右边挨着
+        self.assertIsNone(group.collide(box(0, 10, 20, 5)))  # 下边挨着
+        self.assertIs(group.collide(box(9, 0, 2, 10)), left)  # 跨过两个精灵时返回先加入的
+        self.assertEqual(group.span(20, 30), [right])
+        self.assertEqual(group.span(-10, 0), [left])
+        self.assertEqual(group.span(10, 10), [left, right])
+        self.assertEqual(group.span(21, 30), [])
+        group.add(wide)  # 很宽的精灵左端离查询范围很远
+        self.assertEqual(group.span(150, 160), [wide])
+        self.assertIs(group.collide(box(150, 0, 5, 5)), wide)
+
+
+if __name__ == '__main__':
+    unittest.main()
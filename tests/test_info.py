@@ -0,0 +1,95 @@
+"""
+文字标签测试：字形拼接的标签与整串文字直接渲染再放缩的结果逐像素相同
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import os
+import random
+import unittest
+
+os.environ.setdefault('SUPERMARIO_HEADLESS', '1')
+
+import pygame
+
+from source import constants as C
+from source.components import info
+
+HUD_TEXTS = ['1 PLAYER GAME', '2 PLAYER GAME', 'TOP - ', '000000', 'WORLD', '1 - 1', 'X    3', 'GAME OVER',
+             'MARIO', 'TIME', 'x00', 'x99', '012345', '987650', '300', '401']  # 游戏中出现的文字
+
+
+def baseline_label(text, size=40, width_scale=1.25, height_scale=1):
+    """
+    整串文字直接渲染再放缩
+    :param text: 文字内容
+    :param size: 字体大小
+    :param width_scale: 标签宽系数
+    :param height_scale: 标签高系数
+    :return: 标签图片
+    """
+    label = pygame.font.SysFont(C.FONT, size).render(text, False, info.WHITE)
+    rect = label.get_rect()
+    return pygame.transform.scale(label, (int(rect.width * width_scale), int(rect.height * height_scale)))
+
+
+class LabelParityTest(unittest.TestCase):
+    """ 字形拼接与整串渲染的像素一致性 """
+
+    def assert_parity(self, atlas, text, **kwargs):
+        """
+        比较两种方式生成的标签
+        :param atlas: 字形图集
+        :param text: 文字内容
+        """
+        expected = baseline_label(text, **kwargs)
+        actual = atlas.draw_label(text)
+        self.assertEqual(actual.get_size(), expected.get_size(), text)
+        self.assertEqual(info.opaque_bytes(actual), info.opaque_bytes(expected), text)
+
+    def test_hud_texts(self):
+        atlas = info.GlyphAtlas()
+        for text in HUD_TEXTS:
+            self.assert_parity(atlas, text)
+            self.assertTrue(atlas.composable(text), text)
+
+    def test_scaled_atlas(self):
+        atlas = info.GlyphAtlas(32, 1.5, 1.2)
+        for text in HUD_TEXTS:
+            self.assert_parity(atlas, text, size=32, width_scale=1.5, height_scale=1.2)
+
+    def test_random_texts(self):
+        atlas = info.GlyphAtlas()
+        rng = random.Random(2022)
+        for _ in range(300):
+            text = ''.join(rng.choice(info.GLYPHS) for _ in range(rng.randint(1, 12)))
+            self.assert_parity(atlas, text)
+
+    def test_fallback(self):
+        atlas = info.GlyphAtlas()
+        for text in ['', 'ij', 'FIJI', 'é']:
+            self.assert_parity(atlas, text)
+
+
+class LabelCacheTest(unittest.TestCase):
+    """ 标签缓存的容量 """
+
+    def test_lru(self):
+        atlas = info.GlyphAtlas()
+        first = atlas.render('MARIO')
+        for value in range(C.LABEL_CACHE * 2):
+            atlas.render('{:06d}'.format(value))
+            self.assertIs(atlas.render('MARIO'), first)
+        self.assertEqual(len(atlas.labels), C.LABEL_CACHE)
+
+    def test_hud_field_bypasses_cache(self):
+        field = info.HudField('score', '{:06d}', (0, 0))
+        atlas = info.get_atlas()
+        size = len(atlas.labels)
+        for value in range(50):
+            field.update({'score': value})
+        self.assertEqual(len(atlas.labels), size)
+        self.assertEqual(info.opaque_bytes(field.image), info.opaque_bytes(baseline_label('000049')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+静态图层测试：砖块和宝箱经过静态图层画出来与逐个绘制的结果逐像素相同，并且blit次数更少
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import os
+import random
+import unittest
+
+os.environ.setdefault('SUPERMARIO_HEADLESS', '1')
+
+import pygame
+
+from source import setup, tools, replay
+from source.states import level
+
+GAME_INFO = {'score': 0, 'coin': 0, 'lives': 3, 'player_state': 'small'}
+
+
+def new_level(level_num, interpolate=False):
+    """
+    创建并开启一个关卡
+    :param level_num: 关卡序号
+    :param interpolate: 是否插值绘制所有精灵
+    :return: 关卡对象和它的游戏时钟
+    """
+    clock = tools.GameClock()
+    lv = level.Level(clock, interpolate=interpolate)
+    lv.start(dict(GAME_INFO, level_num=level_num))
+    return lv, clock
+
+
+def noise(size, rng):
+    """
+    随机像素的底图，透明像素合成错误时会露出来
+    :param size: 尺寸
+    :param rng: 随机数生成器
+    :return: 底图
+    """
+    return pygame.image.frombytes(bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)), size, 'RGB')
+
+
+def draw_tiles(lv, surface, alpha, layered):
+    """
+    只绘制砖块和宝箱
+    :param lv: 关卡对象
+    :param surface: 绘图设备
+    :param alpha: 插值系数
+    :param layered: 是否经过静态图层
+    :return: blit的次数
+    """
+    view = lv.game_window
+    offset = (-view.x, -view.y)
+    lv.blits = 0
+    if layered:
+        lv.blits += lv.static_layer.draw(surface, view, offset)
+        covered = []
+        for group in (lv.brick_group, lv.box_group):
+            lv.draw_group(surface, group, view, offset, alpha, lv.static_layer.baked, covered)
+    else:
+        for group in (lv.brick_group, lv.box_group):
+            lv.draw_group(surface, group, view, offset, alpha)
+    return lv.blits
+
+
+class StaticLayerTest(unittest.TestCase):
+    """ 静态图层与逐个绘制的一致性 """
+
+    def assert_parity(self, level_num, interpolate, frames=240):
+        """
+        窗口向前滚动，随机顶起和顶碎窗口内的砖块和宝箱，每帧比较两种绘制方式的结果
+        :param level_num: 关卡序号
+        :param interpolate: 是否插值绘制
+        :param frames: 逻辑步数
+        """
+        rng = random.Random(level_num)
+        lv, clock = new_level(level_num, interpolate)
+        alpha = 0.5 if interpolate else 1
+        size = setup.SCREEN.get_size()
+        base = noise(size, rng)
+        for frame in range(frames):
+            clock.tick()
+            lv.update(None, replay.KEY_STATES[0])
+            lv.player.rect.y, lv.player.y_vel = -200, 0  # 玩家留在窗口上方，不会碰到砖块
+            if frame % 4 == 0 and lv.game_window.right < lv.end_x:
+                lv.game_window.x += 30
+            for sprite in list(lv.brick_group) + list(lv.box_group):
+                if sprite.name in ('brick', 'box') and sprite.rect.colliderect(lv.game_window) and \
+                        sprite.state in ('rest', 'open') and rng.random() < 0.05:
+                    if sprite.name == 'brick' and rng.random() < 0.2:
+                        lv.smash(sprite)
+                    else:
+                        lv.bump(sprite)
+            expected, actual = base.copy(), base.copy()
+            draw_tiles(lv, expected, alpha, False)
+            draw_tiles(lv, actual, alpha, True)
+            self.assertEqual(pygame.image.tobytes(actual, 'RGB'), pygame.image.tobytes(expected, 'RGB'),
+                             'level {} frame {}'.format(level_num, frame))
+
+    def test_parity(self):
+        for level_num in (1, 2):
+            self.assert_parity(level_num, False)
+
+    def test_parity_interpolated(self):
+        self.assert_parity(1, True)
+
+    def test_fewer_blits(self):
+        lv, clock = new_level(2)
+        surface = pygame.Surface(setup.SCREEN.get_size())
+        totals = [0, 0]
+        for x in range(0, lv.end_x - lv.game_window.width, 200):
+            lv.game_window.x = x
+            totals[0] += draw_tiles(lv, surface, 1, False)
+            totals[1] += draw_tiles(lv, surface, 1, True)
+        self.assertGreater(totals[0], 0)
+        self.assertLess(totals[1], totals[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
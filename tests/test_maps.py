@@ -0,0 +1,77 @@
+"""
+地图编译器测试：可选字段的缺失与null、浮点数字段、编译结果的读取
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import unittest
+
+from source import maps
+
+
+def map_data(**tables):
+    """
+    最小的合法地图数据
+    :param tables: 覆盖或者追加的元素列表
+    :return: json地图数据
+    """
+    data = {'image_name': 'level_1', 'maps': [{'start_x': 0, 'end_x': 100, 'player_x': 10, 'player_y': 20}],
+            'enemy': [{'0': []}], 'checkpoint': []}
+    data.update(tables)
+    return data
+
+
+def compile_rows(name, **tables):
+    """
+    编译地图并读取一张表
+    :param name: 表名
+    :param tables: 覆盖或者追加的元素列表
+    :return: 行列表
+    """
+    return list(maps.parse(maps.compile_map(map_data(**tables), 'test.json'), 'test.json')[2].rows(name))
+
+
+class OptionalFieldTest(unittest.TestCase):
+    """ 没有写的可选字段、显式写成null的可选字段与具体数值互不混淆 """
+
+    def test_brick_num(self):
+        bricks = [{'x': 0, 'y': 0, 'type': 0}, {'x': 0, 'y': 0, 'type': 0, 'brick_num': None},
+                  {'x': 0, 'y': 0, 'type': 0, 'brick_num': -1}, {'x': 0, 'y': 0, 'type': 0, 'brick_num': 7}]
+        self.assertEqual([row[-1] for row in compile_rows('brick', brick=bricks)], [maps.ABSENT, maps.NULL, -1, 7])
+
+    def test_enemy_groupid(self):
+        checkpoints = [{'x': 0, 'y': 0, 'width': 1, 'height': 1, 'type': 1},
+                       {'x': 0, 'y': 0, 'width': 1, 'height': 1, 'type': 1, 'enemy_groupid': None},
+                       {'x': 0, 'y': 0, 'width': 1, 'height': 1, 'type': 0, 'enemy_groupid': 0}]
+        rows = compile_rows('checkpoint', checkpoint=checkpoints)
+        self.assertEqual([row[5] for row in rows], [maps.ABSENT, maps.NULL, 0])
+
+    def test_null_with_default_value(self):
+        rows = compile_rows('brick', brick=[{'x': 0, 'y': 0, 'type': 1, 'color': None}])
+        self.assertEqual(rows[0][3], 0)
+
+    def test_required_field(self):
+        for brick in [{'x': 0, 'y': 0}, {'x': 0, 'y': 0, 'type': None}]:
+            with self.assertRaises(ValueError):
+                compile_rows('brick', brick=[brick])
+
+    def test_reserved_values(self):
+        for value in [maps.ABSENT, maps.NULL, 2 ** 31]:
+            with self.assertRaises(ValueError):
+                compile_rows('brick', brick=[{'x': value, 'y': 0, 'type': 0}])
+
+
+class NumberTest(unittest.TestCase):
+    """ 字段值的类型 """
+
+    def test_integral_float(self):
+        rows = compile_rows('coin', coin=[{'x': 1.0, 'y': -2.0}])
+        self.assertEqual(rows, [(1, -2)])
+
+    def test_rejected_values(self):
+        for value in [1.5, float('nan'), float('inf'), True, '1']:
+            with self.assertRaises(ValueError):
+                compile_rows('coin', coin=[{'x': value, 'y': 0}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+录像文件测试：录制、保存、读取、回放之后每一帧的按键状态与录制时相同
+__author__ = 201220014@smail.nju.edu.cn
+"""
+
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+os.environ.setdefault('SUPERMARIO_HEADLESS', '1')
+
+import pygame
+
+from source import constants as C
+from source import replay
+
+
+def key_frames(rng):
+    """
+    随机的按键序列，包括一段超过MAX_RUN帧的不按键和一段超过MAX_RUN帧一直按住右键
+    :param rng: 随机数生成器
+    :return: 每一帧的按键状态，{按键: 是否按下}
+    """
+    def pressed(mask):
+        return {key: bool(mask & bit) for key, bit in replay.KEY_BITS.items()}
+
+    frames = []
+    for _ in range(200):
+        frames.extend([pressed(rng.randrange(1 << len(replay.KEYS)))] * rng.choice([1, 1, 2, 7, 60]))
+    frames.extend([pressed(0)] * (replay.MAX_RUN * 2 + 3))
+    frames.extend([pressed(replay.KEY_BITS[pygame.K_RIGHT])] * (replay.MAX_RUN + 1))
+    frames.append(pressed(0))
+    return frames
+
+
+class ReplayFileTest(unittest.TestCase):
+    """ 录像文件的读写 """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.smk')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        frames = key_frames(random.Random(0))
+        recorder = replay.Recorder()
+        for keys in frames:
+            recorder.record(keys)
+        self.assertEqual(recorder.frame_count, len(frames))
+        recorder.save(self.path)
+
+        self.assertEqual(replay.frame_count(self.path), len(frames))
+        fps, runs = replay.load(self.path)
+        self.assertEqual(fps, C.FPS)
+        self.assertTrue(all(count <= replay.MAX_RUN for count, _ in runs))
+        # 超过MAX_RUN帧的游程拆成了多个：2 * MAX_RUN + 3帧拆成3个，MAX_RUN + 1帧拆成2个
+        self.assertEqual(len(runs), len(recorder.runs) + 3)
+        self.assertEqual(os.path.getsize(self.path), replay.HEADER.size + len(runs) * replay.RUN.size)
+
+        player = replay.Replay.load(self.path)
+        for frame, keys in enumerate(frames):
+            self.assertFalse(player.finished)
+            state = player.next_keys()
+            self.assertEqual({key: state[key] for key in replay.KEYS}, keys, 'frame {}'.format(frame))
+            self.assertFalse(state[pygame.K_SPACE])  # 录像不记录的按键
+        self.assertTrue(player.finished)
+        self.assertIsNone(player.next_keys())
+
+    def test_empty(self):
+        replay.save(self.path, [])
+        player = replay.Replay.load(self.path)
+        self.assertTrue(player.finished)
+        self.assertIsNone(player.next_keys())
+
+    def test_bad_magic(self):
+        with open(self.path, 'wb') as f:
+            f.write(replay.HEADER.pack(b'SMKX', replay.VERSION, C.FPS, 3) + replay.RUN.pack(3, 0))
+        self.assertEqual(replay.frame_count(self.path), 0)
+        with self.assertRaises(ValueError):
+            replay.load(self.path)
+
+    def test_corrupted(self):
+        replay.save(self.path, [(5, 1), (3, 0)])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for broken in (data[:replay.HEADER.size - 1], data[:-1],
+                       data[:replay.HEADER.size - 4] + struct.pack('<I', 9) + data[replay.HEADER.size:]):
+            with open(self.path, 'wb') as f:
+                f.write(broken)
+            with self.assertRaises(ValueError):
+                replay.load(self.path)
+
+    def test_fps_mismatch(self):
+        replay.save(self.path, [(5, 1)], fps=C.FPS + 1)
+        with self.assertRaises(ValueError):
+            replay.Replay.load(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()